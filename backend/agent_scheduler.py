@@ -0,0 +1,131 @@
+"""
+Priority-Aware Agent Scheduler
+Admits Dedalus agent runs by the orchestration priority (high/medium/low) of their branch.
+When capacity is scarce, waiting high-priority branches are admitted before lower ones;
+low-priority branches are deferred for a bounded time and skipped under heavy load.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+from settings import settings
+from bulkhead import BulkheadFull
+
+
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+PRIORITIES = ("high", "medium", "low")
+
+# Concurrent agent runs admitted
+AGENT_SCHEDULER_CAPACITY = settings.get_int("AGENT_SCHEDULER_CAPACITY", 4)
+# Low-priority branches are skipped outright when this many branches are already waiting
+LOW_PRIORITY_SKIP_QUEUE_DEPTH = settings.get_int("LOW_PRIORITY_SKIP_QUEUE_DEPTH", 8)
+# Low-priority branches are skipped after waiting this long for a slot
+LOW_PRIORITY_MAX_DEFER_SECONDS = settings.get_float("LOW_PRIORITY_MAX_DEFER_SECONDS", 15)
+# High and medium priority branches fail with 503 after waiting this long
+AGENT_SCHEDULER_MAX_WAIT_SECONDS = settings.get_float("AGENT_SCHEDULER_MAX_WAIT_SECONDS", 60)
+
+
+class AgentSkipped(Exception):
+    """Raised when a low-priority branch is skipped because of load"""
+
+    def __init__(self, priority: str, reason: str):
+        super().__init__(f"{priority}-priority agent run skipped: {reason}")
+        self.priority = priority
+        self.reason = reason
+
+
+def normalize_priority(priority: str) -> str:
+    priority = (priority or "medium").strip().lower()
+    return priority if priority in PRIORITY_RANK else "medium"
+
+
+class PriorityScheduler:
+    def __init__(self, capacity: int, skip_queue_depth: int, max_defer_seconds: float, max_wait_seconds: float):
+        self.capacity = capacity
+        self.skip_queue_depth = skip_queue_depth
+        self.max_defer_seconds = max_defer_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.active = 0
+        self._waiting = []  # heap of (rank, sequence, future)
+        self._sequence = itertools.count()
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.skipped = {priority: 0 for priority in PRIORITIES}
+        self.total_wait_seconds = {priority: 0.0 for priority in PRIORITIES}
+
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._waiting if not future.done())
+
+    async def _acquire(self, priority: str):
+        rank = PRIORITY_RANK[priority]
+        if self.active < self.capacity and not self.queue_depth():
+            self.active += 1
+            return
+
+        if priority == "low" and self.queue_depth() >= self.skip_queue_depth:
+            self.skipped[priority] += 1
+            raise AgentSkipped(priority, f"{self.queue_depth()} branches already waiting")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (rank, next(self._sequence), future))
+        timeout = self.max_defer_seconds if priority == "low" else self.max_wait_seconds
+        try:
+            await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            if priority == "low":
+                self.skipped[priority] += 1
+                raise AgentSkipped(priority, f"deferred for {timeout:g}s without capacity")
+            raise BulkheadFull("agent_scheduler", max(1, int(timeout / 4)))
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as the waiter was cancelled
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        """Hand the slot to the highest-priority waiter, or free it"""
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: str):
+        """Hold an agent-run slot for the duration of the block"""
+        priority = normalize_priority(priority)
+        wait_started = time.perf_counter()
+        await self._acquire(priority)
+        self.admitted[priority] += 1
+        self.total_wait_seconds[priority] += time.perf_counter() - wait_started
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict:
+        waiting = {priority: 0 for priority in PRIORITIES}
+        for rank, _, future in self._waiting:
+            if not future.done():
+                waiting[PRIORITIES[rank]] += 1
+        return {
+            "capacity": self.capacity,
+            "active": self.active,
+            "waiting": waiting,
+            "admitted": dict(self.admitted),
+            "skipped": dict(self.skipped),
+            "avg_wait_seconds": {
+                priority: round(self.total_wait_seconds[priority] / self.admitted[priority], 4) if self.admitted[priority] else 0.0
+                for priority in PRIORITIES
+            },
+        }
+
+
+agent_scheduler = PriorityScheduler(
+    capacity=AGENT_SCHEDULER_CAPACITY,
+    skip_queue_depth=LOW_PRIORITY_SKIP_QUEUE_DEPTH,
+    max_defer_seconds=LOW_PRIORITY_MAX_DEFER_SECONDS,
+    max_wait_seconds=AGENT_SCHEDULER_MAX_WAIT_SECONDS,
+)
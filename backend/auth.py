@@ -3,22 +3,41 @@ Authentication routes and utilities
 """
 from fastapi import APIRouter, HTTPException, Depends, Header
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Dict, Optional
+import heapq
+import hmac
 import jwt
-import os
+import time
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
+from settings import settings
 from database import get_db
 from models.user import User
+from ttl_cache import TTLCache
+from metrics import CACHE_EVENTS
 
-load_dotenv()
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
-JWT_SECRET = os.getenv("JWT_SECRET", "change_this_to_a_long_random_string_in_production")
+JWT_SECRET = settings.get_str("JWT_SECRET", "change_this_to_a_long_random_string_in_production")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_DAYS = 7
 
+# Shared secret for /debug endpoints; they are disabled when unset
+ADMIN_TOKEN = settings.get_str("ADMIN_TOKEN")
+
+# Verified token -> user, so authenticated requests skip the JWT decode and user lookup
+AUTH_CACHE_SIZE = settings.get_int("AUTH_CACHE_SIZE", 1024)
+AUTH_CACHE_TTL_SECONDS = settings.get_float("AUTH_CACHE_TTL_SECONDS", 60)
+
+_user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+# Logged-out token -> its exp. A deny-list must never evict, so entries only leave once the
+# token has expired anyway; the heap orders them by exp for cheap pruning
+_revoked_tokens: Dict[str, float] = {}
+_revocation_expiries = []
+# User id -> when its document last changed, oldest first; cache entries looked up before that are
+# stale. Only the last AUTH_CACHE_TTL_SECONDS matter, since older cache entries have expired
+_user_changed_at: Dict[str, float] = {}
+
 # Request models
 class RegisterRequest(BaseModel):
     fullName: str
@@ -55,6 +74,35 @@ def verify_token(token: str) -> dict:
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=403, detail="Invalid token")
 
+def invalidate_cached_user(user_id: str):
+    """Drop cached lookups for a user after their document changes"""
+    now = time.monotonic()
+    # Re-inserted so the dict stays ordered by change time
+    _user_changed_at.pop(user_id, None)
+    _user_changed_at[user_id] = now
+    while _user_changed_at:
+        oldest_id = next(iter(_user_changed_at))
+        if _user_changed_at[oldest_id] > now - AUTH_CACHE_TTL_SECONDS:
+            break
+        del _user_changed_at[oldest_id]
+
+def revoke_token(token: str, expires_at: float):
+    """Reject a token until its exp (a Unix timestamp)"""
+    _revoked_tokens[token] = expires_at
+    heapq.heappush(_revocation_expiries, (expires_at, token))
+
+def is_token_revoked(token: str) -> bool:
+    now = time.time()
+    while _revocation_expiries and _revocation_expiries[0][0] <= now:
+        expires_at, expired = heapq.heappop(_revocation_expiries)
+        if _revoked_tokens.get(expired) == expires_at:
+            del _revoked_tokens[expired]
+    return token in _revoked_tokens
+
+def _extract_token(authorization: str) -> str:
+    # Extract token from "Bearer <token>"
+    return authorization.split(" ")[1] if " " in authorization else authorization
+
 # Dependency to get current user
 async def get_current_user(authorization: Optional[str] = Header(None)):
     """Get current authenticated user from token"""
@@ -62,8 +110,20 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
         raise HTTPException(status_code=401, detail="Access denied. No token provided.")
     
     try:
-        # Extract token from "Bearer <token>"
-        token = authorization.split(" ")[1] if " " in authorization else authorization
+        token = _extract_token(authorization)
+        if is_token_revoked(token):
+            raise HTTPException(status_code=403, detail="Invalid token")
+
+        cached = _user_cache.get(token)
+        if cached is not None:
+            looked_up_at, user = cached
+            if looked_up_at > _user_changed_at.get(user["id"], float("-inf")):
+                CACHE_EVENTS.inc(cache="auth_user", result="hit")
+                return user
+            _user_cache.pop(token)
+        CACHE_EVENTS.inc(cache="auth_user", result="miss")
+        looked_up_at = time.monotonic()
+
         payload = verify_token(token)
         user_id = payload.get("userId")
         
@@ -71,7 +131,7 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
             raise HTTPException(status_code=403, detail="Invalid token")
         
         db = get_db()
-        if not db:
+        if db is None:
             raise HTTPException(status_code=500, detail="Database not connected")
         
         user_model = User(db)
@@ -80,12 +140,32 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
+        # Never cache past the token's own expiry
+        ttl = min(AUTH_CACHE_TTL_SECONDS, payload.get("exp", 0) - time.time())
+        if ttl > 0:
+            _user_cache.set(token, (looked_up_at, user), ttl=ttl)
         return user
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error authenticating token: {str(e)}")
 
+async def get_optional_user(authorization: Optional[str] = Header(None)):
+    """Get the current user if a valid token was sent, otherwise None"""
+    if not authorization:
+        return None
+    try:
+        return await get_current_user(authorization)
+    except HTTPException:
+        return None
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guard for operator-only endpoints, authenticated by the X-Admin-Token header"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
 # Routes
 @router.post("/register", response_model=AuthResponse)
 async def register(request: RegisterRequest):
@@ -101,7 +181,7 @@ async def register(request: RegisterRequest):
         user_id = f"user_{int(datetime.utcnow().timestamp() * 1000)}"
         
         try:
-            if db:
+            if db is not None:
                 user_model = User(db)
                 user = await user_model.create_user(
                     full_name=request.fullName,
@@ -154,12 +234,14 @@ async def login(request: LoginRequest):
         user_name = request.email.split("@")[0]
         
         try:
-            if db:
+            if db is not None:
                 user_model = User(db)
                 user = await user_model.find_by_email(request.email, include_password=True)
                 if user:
-                    if user_model.verify_password(request.password, user["password"]):
+                    if await user_model.verify_password(request.password, user["password"]):
+                        await user_model.rehash_password_if_needed(user["id"], request.password, user["password"])
                         await user_model.update_last_login(user["id"])
+                        invalidate_cached_user(user["id"])
                         user_id = user["id"]
                         user_name = user["fullName"]
                     else:
@@ -195,6 +277,21 @@ async def login(request: LoginRequest):
             user={"id": user_id, "fullName": request.email.split("@")[0], "email": request.email}
         )
 
+@router.post("/logout")
+async def logout(authorization: Optional[str] = Header(None)):
+    """Logout: revoke the token and drop its cached user"""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Access denied. No token provided.")
+    
+    token = _extract_token(authorization)
+    _user_cache.pop(token)
+    try:
+        payload = verify_token(token)
+        revoke_token(token, max(payload.get("exp", 0), time.time() + 1))
+    except HTTPException:
+        pass
+    return {"success": True, "message": "Logged out"}
+
 @router.get("/verify")
 async def verify_token_endpoint(current_user: dict = Depends(get_current_user)):
     """Verify token and return user info"""
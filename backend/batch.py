@@ -0,0 +1,282 @@
+"""
+Batch Submissions
+Runs many ideas through the pipeline together for /api/submit/batch. Intent parsing and
+orchestration go to Cortex several ideas per call. Agent research is shared by ideas with the
+same industry and location (and budget, for financial research). Batch agent runs are capped
+globally, and so are the per-idea format and synthesis calls, so a spreadsheet upload cannot take
+every agent slot or fill the Cortex bulkhead ahead of interactive submissions.
+Each idea's result is yielded as soon as it is ready.
+
+Overload degradations (see overload.py) apply as in /api/submit: single_branch keeps each
+idea's higher-priority agent, prefer_cached_research serves cached research instead of a new
+run, and skip_synthesis leaves out the synthesized plans.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+from settings import settings
+from snowflake_service import parse_intents, orchestrate_agents_batch, format_response, synthesize_responses
+from dedalus_agent import research_business_idea, research_financial_planning, research_cache_key, get_cached_research
+from mcp_selection import select_mcp_servers
+from agent_scheduler import agent_scheduler, AgentSkipped, PRIORITY_RANK, normalize_priority
+from metrics import time_stage, FALLBACKS, CACHE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# Most ideas accepted in one batch request
+BATCH_MAX_ITEMS = settings.get_int("BATCH_MAX_ITEMS", 100)
+# Agent runs all batch requests together may have in flight (each also takes an agent_scheduler slot)
+BATCH_AGENT_CONCURRENCY = settings.get_int("BATCH_AGENT_CONCURRENCY", 2)
+# Per-idea Cortex calls (format, synthesis) all batch requests together may have in flight,
+# so a large batch leaves room in the cortex bulkhead for interactive submissions
+BATCH_LLM_CONCURRENCY = settings.get_int("BATCH_LLM_CONCURRENCY", 4)
+# Ideas quoted to the agent when several share one research run
+BATCH_GROUP_EXAMPLES = 3
+
+_batch_agent_slots = asyncio.Semaphore(BATCH_AGENT_CONCURRENCY)
+_batch_llm_slots = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+class ResearchGroup:
+    """Ideas that share one agent run (and one format call) for a section"""
+
+    def __init__(self, agent: str, industry: str, location: Optional[str], budget: Optional[str]):
+        self.agent = agent
+        self.industry = industry
+        self.location = location
+        self.budget = budget
+        self.members: List[Dict] = []
+        self.task: Optional[asyncio.Task] = None
+        self.from_cache = False
+
+    @property
+    def priority(self) -> str:
+        key = f"{self.agent}_priority"
+        return min((normalize_priority(member["orchestration"].get(key)) for member in self.members),
+                   key=lambda priority: PRIORITY_RANK[priority])
+
+    def agent_input(self) -> str:
+        first = self.members[0]
+        enhancement = first["orchestration"].get("enhanced_prompts", {}).get(self.agent, "")
+        if len(self.members) == 1:
+            message = first["request"].message
+        else:
+            business_type = first["intent"].get("business_type") or self.industry
+            examples = "\n".join(f"- {member['request'].message}" for member in self.members[:BATCH_GROUP_EXAMPLES])
+            message = (f"A {business_type} business in the {self.industry} industry. "
+                       f"This research is shared by several similar ideas, for example:\n{examples}")
+        return f"{message}\n\nAdditional context: {enhancement}" if enhancement else message
+
+    async def run(self, prefer_cached: bool = False) -> Optional[Dict]:
+        """Research and format for the whole group; None when the scheduler skipped it"""
+        message = self.agent_input()
+        intent = self.members[0]["intent"]
+        if self.agent == "legal":
+            cache_key = research_cache_key("legal", message, self.location)
+        else:
+            cache_key = research_cache_key("financial", message, self.location, self.budget)
+        cached = None
+        if prefer_cached:
+            cached = get_cached_research(cache_key)
+            CACHE_EVENTS.inc(cache="research", result="hit" if cached else "miss")
+        if cached:
+            self.from_cache = True
+            result = {"success": True, "research_results": cached, "source": "cache", "status": "completed"}
+        else:
+            result = await self._research(message, intent, cache_key)
+            if result is None:
+                return None
+        if not result["success"] or not result["research_results"]:
+            return result
+        async with _batch_llm_slots:
+            with time_stage(f"format_{self.agent}"):
+                result["formatted"] = await format_response(
+                    result["research_results"],
+                    "legal" if self.agent == "legal" else "finance"
+                )
+        return result
+
+    async def _research(self, message: str, intent: Dict, cache_key: str) -> Optional[Dict]:
+        servers = select_mcp_servers(self.agent, intent, self.priority)
+        try:
+            async with _batch_agent_slots:
+                async with agent_scheduler.slot(self.priority):
+                    if self.agent == "legal":
+                        return await research_business_idea(
+                            message,
+                            self.location,
+                            mcp_servers=servers,
+                            parsed_intent=intent,
+                            cache_key=cache_key
+                        )
+                    return await research_financial_planning(
+                        message,
+                        self.budget or "not-specified",
+                        self.location,
+                        mcp_servers=servers,
+                        parsed_intent=intent,
+                        cache_key=cache_key
+                    )
+        except AgentSkipped as e:
+            logger.info("Batch %s research for %s skipped: %s", self.agent, self.industry, e)
+            return None
+
+
+def _group_key(agent: str, index: int, request, intent: Dict) -> tuple:
+    industry = _normalize(intent.get("industry"))
+    location = _normalize(request.location or intent.get("location"))
+    if not industry or industry == "unknown":
+        # Nothing to share research on
+        return (agent, "idea", index)
+    if agent == "financial":
+        return (agent, industry, location, _normalize(request.budget))
+    return (agent, industry, location)
+
+
+def _item_error(index: int, message: str, data: Dict = None) -> Dict:
+    return {"index": index, "success": False, "message": message, "data": data}
+
+
+async def _finish_item(member: Dict, groups: Dict[str, ResearchGroup], degradations: List[str]) -> Dict:
+    """Wait for an idea's shared research, then synthesize its own plan"""
+    index, request = member["index"], member["request"]
+    response_data = {
+        "received_idea": request.message,
+        "budget": request.budget,
+        "location": request.location,
+        "parsed_intent": member["intent"],
+        "orchestration": member["orchestration"],
+        "status": "completed"
+    }
+    skipped_agents = list(member.get("skipped_agents", []))
+    applied_degradations = list(member.get("degradations", []))
+    formatted = {}
+    for agent, group in groups.items():
+        try:
+            result = await asyncio.shield(group.task)
+        except Exception as e:
+            return _item_error(index, f"{agent.capitalize()} agent error: {e}", {**response_data, "status": "failed"})
+        if result is None:
+            skipped_agents.append(agent)
+            continue
+        if not result["success"]:
+            return _item_error(index, f"{agent.capitalize()} agent error: {result.get('error', 'Unknown error')}",
+                               {**response_data, "status": "failed"})
+        if group.from_cache:
+            applied_degradations.append(f"cached_{agent}_research")
+        formatted[agent] = result.get("formatted")
+        response_data[agent] = {"formatted": formatted[agent], "raw": result["research_results"]}
+        if len(group.members) > 1:
+            response_data[agent]["shared_by"] = len(group.members)
+        if result.get("partial"):
+            response_data[agent]["partial"] = True
+            response_data[agent]["source"] = result.get("source")
+            response_data["status"] = "partial"
+
+    if "skip_synthesis" in degradations:
+        applied_degradations.append("skip_synthesis")
+        FALLBACKS.inc(kind="skip_synthesis")
+    else:
+        try:
+            async with _batch_llm_slots:
+                with time_stage("synthesize_responses"):
+                    response_data["synthesized_plan"] = await synthesize_responses(
+                        legal_data=formatted.get("legal"),
+                        financial_data=formatted.get("financial"),
+                        user_message=request.message,
+                        location=request.location,
+                        budget=request.budget
+                    )
+        except Exception as e:
+            logger.warning("Snowflake synthesis failed for batch item %d: %s", index, e)
+            FALLBACKS.inc(kind="synthesis_failed")
+    if skipped_agents:
+        response_data["skipped_agents"] = skipped_agents
+    if applied_degradations:
+        response_data["degradations"] = applied_degradations
+    return {"index": index, "success": True, "message": "Business idea processed successfully", "data": response_data}
+
+
+async def run_batch(requests: List, degradations: List[str] = None) -> AsyncIterator[Dict]:
+    """
+    Process BusinessIdeaRequests together. Intents are parsed before this returns, so
+    configuration errors and a full Cortex bulkhead raise here, before a response has started.
+    Returns an iterator yielding {"index", "success", "message", "data"} per idea in completion
+    order. degradations are the overload degradations to apply.
+    Closing the iterator cancels the remaining work.
+    """
+    with time_stage("batch_parse_intent"):
+        intents = await parse_intents([request.message for request in requests])
+    return _stream_batch(requests, intents, degradations or [])
+
+
+async def _stream_batch(requests: List, intents: List, degradations: List[str]) -> AsyncIterator[Dict]:
+    members = []
+    for index, (request, intent) in enumerate(zip(requests, intents)):
+        if isinstance(intent, Exception):
+            yield _item_error(index, f"Error processing request: {intent}")
+        else:
+            members.append({"index": index, "request": request, "intent": intent})
+
+    with time_stage("batch_orchestrate_agents"):
+        orchestrations = await orchestrate_agents_batch([
+            {"message": m["request"].message, "budget": m["request"].budget,
+             "location": m["request"].location, "parsed_intent": m["intent"]}
+            for m in members
+        ])
+    ready = []
+    for member, orchestration in zip(members, orchestrations):
+        if isinstance(orchestration, Exception):
+            yield _item_error(member["index"], f"Error processing request: {orchestration}")
+        else:
+            member["orchestration"] = orchestration
+            ready.append(member)
+
+    groups: Dict[tuple, ResearchGroup] = {}
+    member_groups = []
+    for member in ready:
+        request, orchestration = member["request"], member["orchestration"]
+        wanted = {
+            "legal": bool(orchestration.get("should_call_legal", True) or request.location),
+            "financial": bool(orchestration.get("should_call_financial", False) or request.budget),
+        }
+        # Under high load only the higher-priority branch runs (legal wins ties)
+        if "single_branch" in degradations and wanted["legal"] and wanted["financial"]:
+            legal_rank = PRIORITY_RANK[normalize_priority(orchestration.get("legal_priority"))]
+            financial_rank = PRIORITY_RANK[normalize_priority(orchestration.get("financial_priority"))]
+            dropped = "legal" if financial_rank < legal_rank else "financial"
+            wanted[dropped] = False
+            member["skipped_agents"] = [dropped]
+            member["degradations"] = ["single_branch"]
+            FALLBACKS.inc(kind="single_branch")
+        own_groups = {}
+        for agent in ("legal", "financial"):
+            if not wanted[agent]:
+                continue
+            key = _group_key(agent, member["index"], request, member["intent"])
+            if key not in groups:
+                groups[key] = ResearchGroup(
+                    agent,
+                    member["intent"].get("industry") or "unknown",
+                    request.location or member["intent"].get("location"),
+                    request.budget
+                )
+            groups[key].members.append(member)
+            own_groups[agent] = groups[key]
+        member_groups.append((member, own_groups))
+
+    logger.info("Batch of %d ideas: %d research runs instead of %d",
+                len(requests), len(groups), sum(len(own) for _, own in member_groups))
+    for group in groups.values():
+        group.task = asyncio.create_task(group.run(prefer_cached="prefer_cached_research" in degradations))
+    item_tasks = [asyncio.create_task(_finish_item(member, own, degradations)) for member, own in member_groups]
+    try:
+        for next_done in asyncio.as_completed(item_tasks):
+            yield await next_done
+    finally:
+        for task in item_tasks + [group.task for group in groups.values()]:
+            task.cancel()
@@ -0,0 +1,72 @@
+"""
+Import Time Report
+Cold-start cost of the API worker: imports main in fresh interpreters, reports wall time against
+a budget, and summarizes `python -X importtime` by top-level package so regressions point at the
+dependency that caused them.
+
+Run from the backend directory:
+    python -m benchmarks.import_time --runs 5 --budget 1.5
+    python -m benchmarks.import_time --module snowflake_service --top 15
+
+Exits 1 when the median cold import exceeds the budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+# Target for `import main` in a fresh interpreter, in seconds
+COLD_START_BUDGET_SECONDS = float(os.getenv("COLD_START_BUDGET_SECONDS", "1.5"))
+
+_TIMER = "import time, sys; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def cold_import_seconds(module: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", _TIMER.format(module=module)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def import_time_by_package(module: str) -> dict:
+    """Self time per top-level package from -X importtime, in seconds"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    ).stderr
+    by_package = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        by_package[name.split(".", 1)[0]] += int(self_us) / 1e6
+    return dict(by_package)
+
+
+def main(args) -> int:
+    timings = sorted(cold_import_seconds(args.module) for _ in range(args.runs))
+    median = statistics.median(timings)
+    by_package = import_time_by_package(args.module)
+
+    print(f"import {args.module}: median {median * 1000:.0f} ms, min {timings[0] * 1000:.0f} ms, "
+          f"max {timings[-1] * 1000:.0f} ms over {args.runs} runs (budget {args.budget * 1000:.0f} ms)")
+    print(f"\nTop {args.top} packages by import self time:")
+    for name, seconds in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {seconds * 1000:9.1f} ms  {name}")
+
+    if median > args.budget:
+        print(f"\nOVER BUDGET by {(median - args.budget) * 1000:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import time report and budget check")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=COLD_START_BUDGET_SECONDS, help="Seconds")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,236 @@
+"""
+End-to-End Load Test
+Drives /api/submit, /api/business-brief and /api/transcribe in-process (httpx ASGI transport)
+against the mock upstreams, and reports per endpoint: throughput, p50/p95/p99 latency, status
+counts, event-loop lag and process memory.
+
+Unless --cortex-url is given, the Cortex stub is started as a subprocess on a free port.
+MongoDB defaults to mongomock:// (or runs without a database if mongomock-motor is missing).
+With UPSTREAM_MODE=replay the recorded cassettes answer instead of the mocks (see cassettes.py).
+
+Run from the backend directory:
+    python -m benchmarks.load_test --endpoints submit,brief,transcribe --concurrency 16 --requests 100 \
+        --cortex-latency lognormal:0.8,0.4 --dedalus-latency lognormal:3,0.3 --sql-latency fixed:0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from benchmarks.mock_upstreams import install_fakes
+
+IDEAS = [
+    ("Open a coffee shop with a small roastery", "$80,000", "Newark, NJ"),
+    ("Start a mobile dog grooming business", "$40,000", "Austin, TX"),
+    ("Launch a bookkeeping service for restaurants", "$15,000", "Chicago, IL"),
+    ("Run a food truck selling arepas", "$60,000", "Miami, FL"),
+]
+
+
+def _rss_mb() -> float:
+    """Current resident set size; falls back to the peak on platforms without /proc"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def _percentile(sorted_values: list, fraction: float):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_cortex_stub(args) -> tuple:
+    port = _free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.mock_upstreams",
+        "--port", str(port),
+        "--latency", args.cortex_latency,
+        "--error-rate", str(args.cortex_error_rate),
+        "--response-chars", str(args.response_chars),
+    ])
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Mock Cortex server did not start")
+
+
+def _submit_request(i: int, distinct: int) -> dict:
+    message, budget, location = IDEAS[i % len(IDEAS)]
+    if distinct == 0 or i < distinct:
+        # Distinct text defeats request coalescing and the research cache, like independent users
+        message = f"{message} (variant {i})"
+    return {"method": "POST", "url": "/api/submit", "json": {"message": message, "budget": budget, "location": location}}
+
+
+def _brief_request(i: int, distinct: int) -> dict:
+    from benchmarks.mock_upstreams import _legal, _financial, _synthesis
+    message, budget, location = IDEAS[i % len(IDEAS)]
+    return {"method": "POST", "url": "/api/business-brief", "json": {
+        "idea": message,
+        "budget": budget,
+        "location": location,
+        "legal_data": _legal(message, 400),
+        "financial_data": _financial(message, 400),
+        "synthesized_plan": _synthesis(message, 400),
+    }}
+
+
+def _transcribe_request(i: int, distinct: int) -> dict:
+    # Deterministic bytes, so replayed runs find their recorded transcripts
+    audio = random.Random(i if distinct == 0 or i < distinct else 0).randbytes(48000)
+    return {"method": "POST", "url": "/api/transcribe", "files": {"audio": ("recording.webm", audio, "audio/webm")}}
+
+
+REQUEST_BUILDERS = {
+    "submit": _submit_request,
+    "brief": _brief_request,
+    "transcribe": _transcribe_request,
+}
+
+
+async def _sample_loop(stop: asyncio.Event, lags: list, rss: list, interval: float = 0.01):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+        if len(lags) % 10 == 0:
+            rss.append(_rss_mb())
+
+
+async def run_endpoint(client, name: str, requests: int, concurrency: int, distinct: int) -> dict:
+    builder = REQUEST_BUILDERS[name]
+    latencies = []
+    statuses = Counter()
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(builder(i, distinct))
+
+    async def worker():
+        while True:
+            try:
+                request = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                await response.aread()
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lags, rss = [], []
+    rss_start = _rss_mb()
+    sampler = asyncio.create_task(_sample_loop(stop, lags, rss))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+
+    latencies.sort()
+    lags.sort()
+    return {
+        "endpoint": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "statuses": dict(statuses),
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_p50_ms": _ms(_percentile(latencies, 0.50)),
+        "latency_p95_ms": _ms(_percentile(latencies, 0.95)),
+        "latency_p99_ms": _ms(_percentile(latencies, 0.99)),
+        "latency_max_ms": _ms(latencies[-1] if latencies else None),
+        "loop_lag_p50_ms": _ms(statistics.median(lags) if lags else None),
+        "loop_lag_p99_ms": _ms(_percentile(lags, 0.99)),
+        "loop_lag_max_ms": _ms(lags[-1] if lags else None),
+        "rss_start_mb": round(rss_start, 1),
+        "rss_peak_mb": round(max(rss + [rss_start]), 1),
+        "rss_end_mb": round(_rss_mb(), 1),
+    }
+
+
+async def main(args):
+    import httpx
+
+    stub = None
+    cortex_url = args.cortex_url
+    if not cortex_url:
+        stub, cortex_url = _start_cortex_stub(args)
+
+    try:
+        os.environ.setdefault("MONGODB_URI", "mongomock://localhost/foundrmate_loadtest")
+        install_fakes(
+            cortex_url,
+            dedalus_latency=args.dedalus_latency,
+            dedalus_error_rate=args.dedalus_error_rate,
+            sql_latency=args.sql_latency,
+            connect_latency=args.connect_latency,
+        )
+        from main import app
+
+        results = []
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+                for name in args.endpoints.split(","):
+                    result = await run_endpoint(client, name.strip(), args.requests, args.concurrency, args.distinct)
+                    results.append(result)
+                    if not args.json:
+                        print(f"{result['endpoint']:>10}: {result}")
+        if args.json:
+            print(json.dumps(results, indent=2))
+        return results
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test against mock upstreams")
+    parser.add_argument("--endpoints", default="submit,brief,transcribe", help="Comma-separated: submit, brief, transcribe")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="Only the first N submit requests get distinct text (0 = all distinct)")
+    parser.add_argument("--cortex-url", help="Use an already running Cortex stub instead of starting one")
+    parser.add_argument("--cortex-latency", default="lognormal:0.8,0.4")
+    parser.add_argument("--cortex-error-rate", type=float, default=0.0)
+    parser.add_argument("--response-chars", type=int, default=1500)
+    parser.add_argument("--dedalus-latency", default="lognormal:3,0.3")
+    parser.add_argument("--dedalus-error-rate", type=float, default=0.0)
+    parser.add_argument("--sql-latency", default="fixed:0.05", help="Per Snowflake SQL statement (blocking)")
+    parser.add_argument("--connect-latency", default="fixed:0.3", help="Per Snowflake connection (blocking)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    asyncio.run(main(parser.parse_args()))
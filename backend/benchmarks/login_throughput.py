@@ -0,0 +1,67 @@
+"""
+Login Throughput Benchmark
+Measures bcrypt password verification throughput during a login storm, and how much it
+delays other work on the event loop, comparing inline bcrypt with the bcrypt executor.
+
+Run from the backend directory:
+    python -m benchmarks.login_throughput --logins 50 --concurrency 10 --rounds 12
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from models import user as user_model
+
+
+async def _measure_loop_lag(stop: asyncio.Event, lags: list, interval: float = 0.005):
+    """Sample how late a short sleep wakes up, a proxy for /api/submit latency impact"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def _storm(verify, hashed: str, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    lags = []
+
+    async def login():
+        async with semaphore:
+            assert await verify("correct horse battery staple", hashed)
+
+    lag_task = asyncio.create_task(_measure_loop_lag(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+
+    lags.sort()
+    return {
+        "logins_per_second": round(logins / elapsed, 2),
+        "loop_lag_p50_ms": round(statistics.median(lags) * 1000, 2) if lags else None,
+        "loop_lag_max_ms": round(lags[-1] * 1000, 2) if lags else None,
+    }
+
+
+async def _inline_verify(password: str, hashed: str) -> bool:
+    return user_model._check_password_sync(password, hashed)
+
+
+async def main(logins: int, concurrency: int, rounds: int):
+    hashed = await user_model.hash_password("correct horse battery staple", rounds=rounds)
+    print(f"bcrypt rounds={rounds} logins={logins} concurrency={concurrency} workers={user_model.BCRYPT_MAX_WORKERS}")
+    for name, verify in (("inline", _inline_verify), ("executor", user_model.check_password)):
+        result = await _storm(verify, hashed, logins, concurrency)
+        print(f"{name:>9}: {result}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=user_model.BCRYPT_ROUNDS)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency, args.rounds))
@@ -0,0 +1,234 @@
+"""
+Microbenchmarks
+Focused timings of the CPU-bound hot paths: PDF rendering across brief sizes, LLM JSON cleanup
+and parsing, JWT generate/verify, bcrypt verification and Pydantic validation of large
+BusinessBriefRequest bodies. Results are saved as JSON baselines; compare flags regressions
+that are both statistically significant (Mann-Whitney U) and larger than a threshold.
+
+Run from the backend directory:
+    python -m benchmarks.microbench run --save benchmarks/baselines/main.json
+    python -m benchmarks.microbench run --cases pdf,llm_json --save /tmp/branch.json
+    python -m benchmarks.microbench compare benchmarks/baselines/main.json /tmp/branch.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+# name -> setup(); setup returns the zero-argument callable to time
+CASES: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _brief(paragraphs: int) -> dict:
+    paragraph = ("Our coffee shop pairs a small in-house roastery with a neighborhood cafe, "
+                 "selling drinks on site and roasted beans wholesale to local restaurants. ") * 4
+    sections = ("executive_summary", "market_opportunity", "target_audience", "plan_of_action", "why_succeed")
+    brief = {"idea_summary": "Neighborhood coffee shop with a small roastery"}
+    for section in sections:
+        brief[section] = "\n\n".join(paragraph for _ in range(paragraphs))
+    return brief
+
+
+def _pdf_case(paragraphs: int):
+    def setup():
+        from pdf_generator import create_business_brief_pdf_from_structured
+        brief = _brief(paragraphs)
+        return lambda: create_business_brief_pdf_from_structured(brief)
+    return setup
+
+
+for _size, _paragraphs in (("small", 1), ("medium", 4), ("large", 16)):
+    case(f"pdf_render_{_size}")(_pdf_case(_paragraphs))
+
+
+def _llm_json_case(pad: int):
+    def setup():
+        from snowflake_service import _parse_llm_json
+        from benchmarks.mock_upstreams import _financial
+        content = "```json\n" + json.dumps(_financial("", pad), indent=2) + "\n```"
+        return lambda: _parse_llm_json(content)
+    return setup
+
+
+case("llm_json_small")(_llm_json_case(200))
+case("llm_json_large")(_llm_json_case(20000))
+
+
+@case("jwt_generate")
+def _jwt_generate():
+    from auth import generate_token
+    return lambda: generate_token("65f1c0ffee0000000000abcd")
+
+
+@case("jwt_verify")
+def _jwt_verify():
+    from auth import generate_token, verify_token
+    token = generate_token("65f1c0ffee0000000000abcd")
+    return lambda: verify_token(token)
+
+
+@case("bcrypt_verify")
+def _bcrypt_verify():
+    import bcrypt
+    from models.user import BCRYPT_ROUNDS, _check_password_sync
+    hashed = bcrypt.hashpw(b"correct horse battery staple", bcrypt.gensalt(BCRYPT_ROUNDS)).decode("utf-8")
+    return lambda: _check_password_sync("correct horse battery staple", hashed)
+
+
+@case("pydantic_brief_request")
+def _pydantic_brief_request():
+    from main import BusinessBriefRequest
+    from benchmarks.mock_upstreams import _legal, _financial, _synthesis
+    body = json.dumps({
+        "idea": "Open a coffee shop with a small roastery",
+        "budget": "$80,000",
+        "location": "Newark, NJ",
+        "legal_data": _legal("", 4000),
+        "financial_data": _financial("", 4000),
+        "synthesized_plan": _synthesis("", 4000),
+    })
+    return lambda: BusinessBriefRequest.model_validate_json(body)
+
+
+def _calibrate(func: Callable, target_seconds: float) -> int:
+    """Loops per sample so that one sample takes roughly target_seconds"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= target_seconds or number >= 1_000_000:
+            return number
+        number *= 2 if elapsed == 0 else max(2, min(10, int(target_seconds / elapsed) + 1))
+
+
+def measure(func: Callable, samples: int, target_seconds: float) -> Dict:
+    func()  # warm-up: imports, caches, first-call allocations
+    number = _calibrate(func, target_seconds)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return {
+        "loops": number,
+        "samples": timings,
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "min": min(timings),
+    }
+
+
+def mann_whitney_p(a: List[float], b: List[float]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test (normal approximation, average ranks for ties)"""
+    combined = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    ranks = [0.0] * len(combined)
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        i = j + 1
+    n1, n2 = len(a), len(b)
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    sd = math.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
+    if sd == 0:
+        return 1.0
+    z = (u - mean) / sd
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def run(args) -> Dict:
+    selected = [name for name in CASES if not args.cases or any(part in name for part in args.cases.split(","))]
+    results = {}
+    for name in selected:
+        try:
+            func = CASES[name]()
+        except ImportError as e:
+            print(f"{name:>24}: skipped ({e})")
+            continue
+        result = measure(func, args.samples, args.target)
+        results[name] = result
+        print(f"{name:>24}: median {result['median'] * 1e6:12.2f} us  stdev {result['stdev'] * 1e6:10.2f} us  "
+              f"({args.samples} x {result['loops']} loops)")
+
+    document = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(document, f, indent=1)
+        print(f"Saved {len(results)} results to {args.save}")
+    return document
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    with open(args.current) as f:
+        current = json.load(f)["results"]
+
+    regressions = 0
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name], current[name]
+        change = after["median"] / before["median"] - 1
+        p_value = mann_whitney_p(before["samples"], after["samples"])
+        significant = p_value < args.alpha and abs(change) >= args.threshold
+        if significant and change > 0:
+            verdict = "REGRESSION"
+            regressions += 1
+        elif significant:
+            verdict = "improved"
+        else:
+            verdict = "same"
+        print(f"{name:>24}: {before['median'] * 1e6:12.2f} -> {after['median'] * 1e6:12.2f} us  "
+              f"{change:+7.1%}  p={p_value:.3f}  {verdict}")
+    for name in sorted(set(baseline) ^ set(current)):
+        print(f"{name:>24}: only in {'baseline' if name in baseline else 'current'}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU hot-path microbenchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run benchmarks")
+    run_parser.add_argument("--cases", help="Comma-separated substrings of case names (default: all)")
+    run_parser.add_argument("--samples", type=int, default=20, help="Timed samples per case")
+    run_parser.add_argument("--target", type=float, default=0.05, help="Seconds per sample")
+    run_parser.add_argument("--save", help="Write results to this JSON file")
+
+    compare_parser = commands.add_parser("compare", help="Compare two saved result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.05, help="Minimum relative slowdown to flag")
+    compare_parser.add_argument("--alpha", type=float, default=0.01, help="Significance level")
+
+    arguments = parser.parse_args()
+    if arguments.command == "run":
+        run(arguments)
+    else:
+        sys.exit(compare(arguments))
@@ -0,0 +1,349 @@
+"""
+Mock Upstreams
+Local stand-ins for the paid upstreams, so /api/submit, /api/business-brief and /api/transcribe
+can be load-tested offline:
+
+- a Cortex inference:complete HTTP stub (run as its own process) that answers each prompt type
+  with a well-formed response, with configurable latency, streaming and error injection
+- FakeAsyncDedalus / FakeDedalusRunner, swapped into dedalus_agent
+- a fake Snowflake connector connection, swapped into transcription_service; like the real
+  connector it blocks the calling thread for its latency
+
+Latency specs: "0", "fixed:1.5", "uniform:0.5,2" or "lognormal:1.2,0.4" (median seconds, sigma).
+
+Run the Cortex stub from the backend directory:
+    python -m benchmarks.mock_upstreams --port 9100 --latency lognormal:0.8,0.4 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from types import SimpleNamespace
+
+CORTEX_PATH = "/api/v2/cortex/inference:complete"
+
+
+def parse_latency(spec: str):
+    """Return a zero-argument callable sampling a latency in seconds from a spec string"""
+    spec = (spec or "0").strip()
+    kind, _, args = spec.partition(":")
+    if not args:
+        value = float(kind)
+        return lambda: value
+    values = [float(part) for part in args.split(",")]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        low, high = values
+        return lambda: random.uniform(low, high)
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def _padding(chars: int) -> str:
+    words = "permit license zoning insurance payroll lease inventory marketing revenue margin".split()
+    text = " ".join(random.choice(words) for _ in range(chars // 7 + 1))
+    return text[:chars]
+
+
+# Canned structured outputs, keyed by the first words of each system prompt in snowflake_service.py.
+# Values must not contain the word "json": the response parser strips its first occurrence.
+def _intent(message: str, pad: int) -> dict:
+    return {
+        "business_type": "coffee shop",
+        "industry": "food service",
+        "location": "Newark, NJ",
+        "needs": {"legal": True, "finance": True},
+    }
+
+
+def _orchestration(message: str, pad: int) -> dict:
+    return {
+        "should_call_legal": True,
+        "should_call_financial": True,
+        "legal_priority": "high",
+        "financial_priority": "medium",
+        "reasoning": "Food service needs permits and a startup budget.",
+        "enhanced_prompts": {"legal": "Focus on health permits.", "financial": "Include equipment costs."},
+    }
+
+
+def _legal(message: str, pad: int) -> dict:
+    return {
+        "summary": "Register the business and obtain food service permits. " + _padding(pad),
+        "steps": [
+            {"title": f"Step {i}", "description": _padding(pad // 4), "agency": "State Department of Health",
+             "links": ["https://www.nj.gov"]}
+            for i in range(1, 6)
+        ],
+        "key_requirements": ["Business registration", "Food handler permit", "Certificate of occupancy"],
+        "estimated_timeline": "6-10 weeks",
+    }
+
+
+def _financial(message: str, pad: int) -> dict:
+    return {
+        "summary": "Expect moderate startup costs driven by equipment and lease. " + _padding(pad),
+        "cost_breakdown": {
+            "startup_costs": 85000,
+            "monthly_operating_costs": 14000,
+            "breakdown": [
+                {"category": f"Category {i}", "amount": 5000 * i, "description": _padding(pad // 4)}
+                for i in range(1, 6)
+            ],
+        },
+        "funding_sources": [
+            {"name": "SBA 7(a) loan", "type": "loan", "description": _padding(pad // 4), "link": "https://www.sba.gov"}
+        ],
+        "recommendations": ["Lease used equipment", "Apply for a microloan"],
+    }
+
+
+def _synthesis(message: str, pad: int) -> dict:
+    return {
+        "executive_summary": "A neighborhood coffee shop with a clear permit path and funding plan. " + _padding(pad),
+        "action_plan": {
+            "immediate_steps": ["Register the LLC", "Apply for permits"],
+            "short_term_goals": ["Sign a lease", "Buy equipment"],
+            "long_term_considerations": ["Second location", "Wholesale beans"],
+        },
+        "risk_assessment": {
+            "legal_risks": ["Permit delays"],
+            "financial_risks": ["Lease costs"],
+            "mitigation_strategies": ["Start permits early"],
+        },
+        "recommendations": ["Keep the menu small"],
+        "next_steps": ["Book an SBA advisor meeting"],
+    }
+
+
+def _batch_count(message: str) -> int:
+    match = re.search(r"exactly (\d+) objects", message)
+    return int(match.group(1)) if match else 1
+
+
+def _intents(message: str, pad: int) -> list:
+    return [_intent(message, pad) for _ in range(_batch_count(message))]
+
+
+def _orchestrations(message: str, pad: int) -> list:
+    return [_orchestration(message, pad) for _ in range(_batch_count(message))]
+
+
+STRUCTURED_RESPONSES = {
+    "You are a business intent parser": _intent,
+    "You are an agent orchestration system": _orchestration,
+    "You are a legal information formatter": _legal,
+    "You are a financial formatter": _financial,
+    "You are a business advisor synthesizer": _synthesis,
+    "You are a batch business intent parser": _intents,
+    "You are a batch agent orchestration system": _orchestrations,
+}
+
+
+def completion_text(payload: dict, response_chars: int) -> str:
+    """The assistant message a Cortex call with this payload should get back"""
+    messages = payload.get("messages") or []
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    user = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+    for prefix, builder in STRUCTURED_RESPONSES.items():
+        if system.startswith(prefix):
+            return "```" + json.dumps(builder(user, response_chars)) + "```"
+    # Idea summary and brief sections are plain text
+    return _padding(response_chars)
+
+
+class CortexStub:
+    def __init__(self, latency: str = "0", error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 unavailable_models: tuple = (), response_chars: int = 1500, stream_chunk_chars: int = 40):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.unavailable_models = set(unavailable_models)
+        self.response_chars = response_chars
+        self.stream_chunk_chars = stream_chunk_chars
+        self.requests = 0
+
+    def build_app(self):
+        from fastapi import FastAPI, Request
+        from fastapi.responses import JSONResponse, StreamingResponse
+
+        app = FastAPI(title="Mock Cortex")
+
+        @app.post(CORTEX_PATH)
+        async def complete(request: Request):
+            payload = await request.json()
+            self.requests += 1
+            await asyncio.sleep(self.sample_latency())
+
+            model = payload.get("model")
+            if model in self.unavailable_models:
+                return JSONResponse(
+                    status_code=400,
+                    content={"message": f"Model {model} is unavailable in your region; enable cross region inference"}
+                )
+            roll = random.random()
+            if roll < self.throttle_rate:
+                return JSONResponse(status_code=429, content={"message": "Too many requests"}, headers={"Retry-After": "1"})
+            if roll < self.throttle_rate + self.error_rate:
+                return JSONResponse(status_code=500, content={"message": "Injected upstream error"})
+
+            text = completion_text(payload, self.response_chars)
+            if payload.get("stream"):
+                return StreamingResponse(self._stream(model, text), media_type="text/event-stream")
+            return {
+                "id": f"mock-{self.requests}",
+                "model": model,
+                "choices": [{"message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(json.dumps(payload)) // 4, "completion_tokens": len(text) // 4},
+            }
+
+        return app
+
+    async def _stream(self, model: str, text: str):
+        for start in range(0, len(text), self.stream_chunk_chars):
+            chunk = {"model": model, "choices": [{"delta": {"content": text[start:start + self.stream_chunk_chars]}}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(0)
+        yield "data: [DONE]\n\n"
+
+
+class FakeAsyncDedalus:
+    """Stands in for dedalus_labs.AsyncDedalus; no network, no API key"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+class FakeDedalusRunner:
+    """Stands in for dedalus_labs.DedalusRunner, returning canned research after a sampled latency"""
+    latency = staticmethod(parse_latency("0"))
+    error_rate = 0.0
+    output_chars = 4000
+
+    def __init__(self, client, *args, **kwargs):
+        self.client = client
+
+    async def run(self, input: str, model: str = None, mcp_servers: list = None, **kwargs):
+        await asyncio.sleep(self.latency())
+        if random.random() < self.error_rate:
+            raise Exception("Injected Dedalus error")
+        servers = list(mcp_servers or [])
+        tools_called = [f"{server.split('/')[-1]}_search" for server in servers[:2]]
+        return SimpleNamespace(
+            final_output=f"Research for: {input[:200]}\n\n{_padding(self.output_chars)}",
+            tools_called=tools_called,
+            tool_results=[{"name": name, "result": "...", "duration_ms": 250} for name in tools_called],
+            steps_used=len(servers) + 1,
+        )
+
+
+class FakeSnowflakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._rows = []
+        self.sfqid = None
+        self.rowcount = 0
+
+    def execute(self, sql: str):
+        # Blocking on purpose: the real connector blocks the calling thread too
+        time.sleep(self.connection.statement_latency())
+        statement = " ".join(sql.split()).upper()
+        self.sfqid = f"mock-{random.getrandbits(32):08x}"
+        if statement.startswith("SHOW STAGES"):
+            self._rows = [("audio_transcription_stage",)]
+        elif statement.startswith("LIST"):
+            self._rows = [("audio_transcription_stage/recording.webm", 48000)]
+        elif "AI_TRANSCRIBE" in statement:
+            self._rows = [(json.dumps({"text": "I want to open a coffee shop in Newark with a budget of 80 thousand dollars."}),)]
+        else:
+            self._rows = [("Statement executed successfully.",)]
+        self.rowcount = len(self._rows)
+        return self
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+
+class FakeSnowflakeConnection:
+    def __init__(self, statement_latency):
+        self.statement_latency = statement_latency
+        self.closed = False
+
+    def cursor(self):
+        return FakeSnowflakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+def install_fakes(cortex_url: str, dedalus_latency: str = "0", dedalus_error_rate: float = 0.0,
+                  sql_latency: str = "0", connect_latency: str = "0"):
+    """
+    Point the backend modules at the Cortex stub and swap in the fake Dedalus runner and
+    Snowflake connection. Call before the app handles requests.
+    """
+    import dedalus_agent
+    import snowflake_service
+    import transcription_service
+
+    snowflake_service.SNOWFLAKE_PAT = snowflake_service.SNOWFLAKE_PAT or "mock-token"
+    snowflake_service.SNOWFLAKE_HOST = cortex_url
+    snowflake_service.SNOWFLAKE_MODEL = snowflake_service.SNOWFLAKE_MODEL or "mock-model"
+    snowflake_service.BASE_ENDPOINT = cortex_url.rstrip("/")
+    snowflake_service.CORTEX_ENDPOINT = snowflake_service.BASE_ENDPOINT + CORTEX_PATH
+
+    FakeDedalusRunner.latency = staticmethod(parse_latency(dedalus_latency))
+    FakeDedalusRunner.error_rate = dedalus_error_rate
+    dedalus_agent.AsyncDedalus = FakeAsyncDedalus
+    dedalus_agent.DedalusRunner = FakeDedalusRunner
+
+    sample_connect = parse_latency(connect_latency)
+    statement_latency = parse_latency(sql_latency)
+
+    def connect():
+        time.sleep(sample_connect())
+        return FakeSnowflakeConnection(statement_latency)
+
+    transcription_service.SNOWFLAKE_ACCOUNT = transcription_service.SNOWFLAKE_ACCOUNT or "mock-account"
+    transcription_service.SNOWFLAKE_USER = transcription_service.SNOWFLAKE_USER or "mock-user"
+    transcription_service.get_snowflake_connection = connect
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mock Cortex inference:complete server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="lognormal:0.8,0.4", help="Latency spec per completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--unavailable-model", action="append", default=[],
+                        help="Answer this model with the region-unavailable error (repeatable)")
+    parser.add_argument("--response-chars", type=int, default=1500, help="Approximate size of generated text fields")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    stub = CortexStub(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        unavailable_models=tuple(args.unavailable_model),
+        response_chars=args.response_chars,
+    )
+    uvicorn.run(stub.build_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
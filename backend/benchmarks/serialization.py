@@ -0,0 +1,119 @@
+"""
+Serialization Benchmark
+Cost of putting a full /api/submit response on the wire: encode time and bytes for FastAPI's
+default path (response_model validation, jsonable_encoder, json.dumps) against orjson, then
+compression time and bytes for gzip levels and brotli qualities (brotli only when installed).
+
+The payload is built from the mock upstream builders plus raw research text of --raw-chars per
+agent, which lands in the 50-100 KB range of real results. Pass --payload with a saved
+/api/submit response body to measure real text, which compresses less than generated text.
+
+Run from the backend directory:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --raw-chars 40000 --payload /tmp/result.json
+"""
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+from typing import Callable, Dict
+
+import orjson
+
+from benchmarks.mock_upstreams import _padding, _intent, _orchestration, _legal, _financial, _synthesis
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_payload(raw_chars: int, pad: int = 1500) -> Dict:
+    random.seed(0)
+    return {
+        "success": True,
+        "message": "Business idea processed successfully",
+        "data": {
+            "received_idea": "Open a coffee shop with a small roastery",
+            "budget": "$80,000",
+            "location": "Newark, NJ",
+            "parsed_intent": _intent("", pad),
+            "orchestration": _orchestration("", pad),
+            "status": "completed",
+            "legal": {"formatted": _legal("", pad), "raw": _padding(raw_chars)},
+            "financial": {"formatted": _financial("", pad), "raw": _padding(raw_chars)},
+            "synthesized_plan": _synthesis("", pad),
+            "idea_id": "6720f0c1a2b3c4d5e6f70812",
+        },
+    }
+
+
+def _time(func: Callable, samples: int) -> float:
+    """Median seconds per call"""
+    func()
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def encoders(content: Dict) -> Dict[str, Callable[[], bytes]]:
+    from fastapi.encoders import jsonable_encoder
+    from main import BusinessIdeaResponse
+
+    def fastapi_default() -> bytes:
+        # What a response_model endpoint did before: validate, encode, JSONResponse.render
+        model = BusinessIdeaResponse.model_validate(content)
+        return json.dumps(
+            jsonable_encoder(model), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+    def orjson_response() -> bytes:
+        # /api/submit now: model_dump of the already-built response, ORJSONResponse.render
+        model = BusinessIdeaResponse.model_validate(content)
+        return orjson.dumps(model.model_dump(), option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+    return {"fastapi_default": fastapi_default, "orjson": orjson_response}
+
+
+def compressors(body: bytes) -> Dict[str, Callable[[], bytes]]:
+    options = {f"gzip-{level}": (lambda level=level: gzip.compress(body, compresslevel=level)) for level in (1, 6, 9)}
+    if brotli is not None:
+        for quality in (1, 4, 6, 11):
+            options[f"br-{quality}"] = lambda quality=quality: brotli.compress(body, quality=quality)
+    return options
+
+
+def main(args):
+    if args.payload:
+        with open(args.payload) as f:
+            content = json.load(f)
+    else:
+        content = build_payload(args.raw_chars)
+
+    print(f"{'encoder':<18}{'median ms':>12}{'bytes':>12}")
+    bodies = {}
+    for name, encode in encoders(content).items():
+        bodies[name] = encode()
+        print(f"{name:<18}{_time(encode, args.samples) * 1000:>12.3f}{len(bodies[name]):>12}")
+
+    body = bodies["orjson"]
+    print(f"\n{'compression':<18}{'median ms':>12}{'bytes':>12}{'ratio':>8}")
+    print(f"{'identity':<18}{0:>12.3f}{len(body):>12}{1:>8.2f}")
+    for name, compress in compressors(body).items():
+        size = len(compress())
+        print(f"{name:<18}{_time(compress, args.samples) * 1000:>12.3f}{size:>12}{len(body) / size:>8.2f}")
+    if brotli is None:
+        print("(install brotli to include br)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response serialization and compression benchmark")
+    parser.add_argument("--raw-chars", type=int, default=30000, help="Raw research text per agent")
+    parser.add_argument("--payload", help="JSON file with a saved submit response to use instead")
+    parser.add_argument("--samples", type=int, default=50)
+    main(parser.parse_args())
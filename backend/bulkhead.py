@@ -0,0 +1,123 @@
+"""
+Upstream Bulkheads
+Named concurrency limits with bounded wait queues around each upstream (Cortex, Dedalus, Snowflake SQL).
+A saturated bulkhead fails fast with BulkheadFull instead of piling more work on the upstream.
+
+Configured per deployment through environment variables, e.g. for the "cortex" bulkhead:
+    BULKHEAD_CORTEX_CONCURRENCY, BULKHEAD_CORTEX_QUEUE, BULKHEAD_CORTEX_MAX_WAIT_SECONDS
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+from settings import settings
+
+# name -> (max concurrent calls, max queued callers, max seconds a caller waits for a slot)
+DEFAULT_LIMITS = {
+    "cortex": (16, 64, 10.0),
+    "dedalus": (4, 16, 30.0),
+    "snowflake_sql": (2, 8, 30.0),
+}
+
+
+class BulkheadFull(Exception):
+    """Raised when a bulkhead cannot admit a caller"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is at capacity, retry after {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, max_wait_seconds: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seen_seconds = 0.0
+        self.total_hold_seconds = 0.0
+
+    def retry_after(self) -> int:
+        """Estimate how long until a slot frees up, from the average time slots are held"""
+        completed = self.admitted - self.active
+        average_hold = self.total_hold_seconds / completed if completed > 0 else 1.0
+        return max(1, math.ceil(average_hold * (self.queued + 1) / self.max_concurrent))
+
+    def _reject(self):
+        self.rejected += 1
+        raise BulkheadFull(self.name, self.retry_after())
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Hold a slot for the duration of the block, or raise BulkheadFull"""
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            self._reject()
+
+        self.queued += 1
+        wait_started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self.queued -= 1
+            self._reject()
+        except BaseException:
+            self.queued -= 1
+            raise
+        self.queued -= 1
+
+        waited = time.perf_counter() - wait_started
+        self.total_wait_seconds += waited
+        self.max_wait_seen_seconds = max(self.max_wait_seen_seconds, waited)
+        self.admitted += 1
+        self.active += 1
+        held_from = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.total_hold_seconds += time.perf_counter() - held_from
+            self._semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_seconds": round(self.total_wait_seconds / self.admitted, 4) if self.admitted else 0.0,
+            "max_wait_seconds": round(self.max_wait_seen_seconds, 4),
+        }
+
+
+_bulkheads: Dict[str, Bulkhead] = {}
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """Return the named bulkhead, creating it from environment configuration on first use"""
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        concurrency, queue, max_wait = DEFAULT_LIMITS.get(name, (8, 32, 10.0))
+        prefix = f"BULKHEAD_{name.upper()}"
+        bulkhead = Bulkhead(
+            name,
+            max_concurrent=settings.get_int(f"{prefix}_CONCURRENCY", concurrency),
+            max_queue=settings.get_int(f"{prefix}_QUEUE", queue),
+            max_wait_seconds=settings.get_float(f"{prefix}_MAX_WAIT_SECONDS", max_wait),
+        )
+        _bulkheads[name] = bulkhead
+    return bulkhead
+
+
+def bulkhead_stats() -> Dict[str, Dict]:
+    """Return stats for every bulkhead created so far"""
+    return {name: bulkhead.stats() for name, bulkhead in _bulkheads.items()}
@@ -0,0 +1,133 @@
+"""
+Upstream Cassettes
+Record/replay of upstream responses (Cortex completions, Dedalus runs, AI_TRANSCRIBE results),
+so performance runs and regressions are reproducible without network access.
+
+UPSTREAM_MODE:
+    live     call the upstream (default)
+    record   call the upstream and save each response with its latency under CASSETTE_DIR
+    replay   serve saved responses without calling the upstream; unknown requests raise CassetteMiss
+
+In replay, each response is delayed by its recorded latency times REPLAY_LATENCY_SCALE
+(1 = original timing, 0 = as fast as possible).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from settings import settings
+from single_flight import make_key
+
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_MODE = settings.get_str("UPSTREAM_MODE", "live").lower()
+CASSETTE_DIR = settings.get_str("CASSETTE_DIR", "cassettes")
+REPLAY_LATENCY_SCALE = settings.get_float("REPLAY_LATENCY_SCALE", 1.0)
+
+UPSTREAM_MODES = ("live", "record", "replay")
+if UPSTREAM_MODE not in UPSTREAM_MODES:
+    raise ValueError(f"UPSTREAM_MODE must be one of {', '.join(UPSTREAM_MODES)}, got {UPSTREAM_MODE!r}")
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when no recording exists for a request"""
+
+    def __init__(self, kind: str, key: str):
+        self.kind = kind
+        self.key = key
+        super().__init__(f"No {kind} cassette for request {key[:12]} in {CASSETTE_DIR}")
+
+
+def cassette_key(kind: str, *parts: Any) -> str:
+    """Key a recording by upstream kind and the request parts that determine the response"""
+    return make_key(kind, *parts)
+
+
+def _path(kind: str, key: str) -> str:
+    return os.path.join(CASSETTE_DIR, kind, f"{key}.json")
+
+
+def _read(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write(path: str, entry: Dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(entry, f, indent=1, default=str)
+    os.replace(temp_path, path)
+
+
+class CassetteStats:
+    def __init__(self):
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    def stats(self) -> Dict:
+        return {
+            "mode": UPSTREAM_MODE,
+            "directory": CASSETTE_DIR if UPSTREAM_MODE != "live" else None,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+cassette_stats = CassetteStats()
+
+
+async def through_cassette(
+    kind: str,
+    key: str,
+    call: Callable[[], Awaitable[Any]],
+    encode: Callable[[Any], Any],
+    decode: Callable[[Any], Any],
+    request_summary: Dict = None,
+) -> Any:
+    """
+    Run an upstream call according to UPSTREAM_MODE.
+    encode turns the call's result into JSON-serializable data for the cassette; decode turns it
+    back into the object callers expect (e.g. an httpx.Response).
+    """
+    if UPSTREAM_MODE == "live":
+        return await call()
+
+    loop = asyncio.get_running_loop()
+    path = _path(kind, key)
+
+    if UPSTREAM_MODE == "replay":
+        entry = await loop.run_in_executor(None, _read, path)
+        if entry is None:
+            cassette_stats.misses += 1
+            raise CassetteMiss(kind, key)
+        delay = entry.get("latency_seconds", 0) * REPLAY_LATENCY_SCALE
+        if delay > 0:
+            await asyncio.sleep(delay)
+        cassette_stats.replayed += 1
+        return decode(entry["response"])
+
+    started = time.perf_counter()
+    result = await call()
+    entry = {
+        "kind": kind,
+        "key": key,
+        "recorded_at": time.time(),
+        "latency_seconds": round(time.perf_counter() - started, 4),
+        "request": request_summary or {},
+        "response": encode(result),
+    }
+    try:
+        await loop.run_in_executor(None, _write, path, entry)
+        cassette_stats.recorded += 1
+    except OSError as e:
+        logger.warning("Could not write %s cassette %s: %s", kind, path, e)
+    return result
@@ -0,0 +1,113 @@
+"""
+Response Compression
+ASGI middleware that compresses large response bodies with brotli or gzip, whichever the client
+prefers in Accept-Encoding (brotli needs the optional "brotli" package). Bodies below
+COMPRESSION_MIN_BYTES, already-encoded bodies and streamed responses (PDFs, NDJSON, SSE) are
+passed through untouched.
+"""
+import gzip
+from typing import Optional
+from settings import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = settings.get_int("COMPRESSION_MIN_BYTES", 1024)
+COMPRESSION_GZIP_LEVEL = settings.get_int("COMPRESSION_GZIP_LEVEL", 6)
+# Brotli 4-5 compresses JSON better than gzip -6 at similar CPU cost; 11 is far too slow per request
+COMPRESSION_BROTLI_QUALITY = settings.get_int("COMPRESSION_BROTLI_QUALITY", 4)
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0; None if neither is acceptable"""
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    candidates = []
+    if brotli is not None:
+        candidates.append("br")
+    candidates.append("gzip")
+    best = None
+    best_quality = 0.0
+    for encoding in candidates:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether the body is compressible
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = [(name, value) for name, value in start["headers"]]
+            header_map = {name.lower(): value for name, value in headers}
+            content_type = header_map.get(b"content-type", b"").decode("latin-1")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or b"content-encoding" in header_map
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers = [(name, value) for name, value in headers if name.lower() not in (b"content-length", b"vary")]
+            vary = header_map.get(b"vary")
+            headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+            headers.append((b"content-encoding", encoding.encode("ascii")))
+            headers.append((b"content-length", str(len(compressed)).encode("ascii")))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,66 +1,179 @@
 """
 Database connection setup
+The Motor client is created once in the FastAPI lifespan and shared by every request.
 """
-# import ssl
-# from motor.motor_asyncio import AsyncIOMotorClient
-import os
-from dotenv import load_dotenv
+import asyncio
+import logging
+import time
+from settings import settings
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 
-load_dotenv()
 
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/foundrmate")
+logger = logging.getLogger(__name__)
+
+MONGODB_URI = settings.get_str("MONGODB_URI", "mongodb://localhost:27017/foundrmate")
+
+# Connection pool tuning
+MONGODB_MAX_POOL_SIZE = settings.get_int("MONGODB_MAX_POOL_SIZE", 50)
+MONGODB_MIN_POOL_SIZE = settings.get_int("MONGODB_MIN_POOL_SIZE", 2)
+MONGODB_MAX_IDLE_TIME_MS = settings.get_int("MONGODB_MAX_IDLE_TIME_MS", 300000)
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = settings.get_int("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000)
+MONGODB_CONNECT_TIMEOUT_MS = settings.get_int("MONGODB_CONNECT_TIMEOUT_MS", 5000)
+MONGODB_SOCKET_TIMEOUT_MS = settings.get_int("MONGODB_SOCKET_TIMEOUT_MS", 20000)
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = settings.get_int("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 5000)
+# Wire compression; snappy and zstd need python-snappy / zstandard installed
+MONGODB_COMPRESSORS = settings.get_str("MONGODB_COMPRESSORS", "zlib")
+# When false the API still starts without MongoDB and auth falls back to token-only users
+MONGODB_REQUIRED = settings.get_bool("MONGODB_REQUIRED", False)
+# Startup ping timeout when MongoDB is optional, so a missing mongod delays startup by at most this
+MONGODB_STARTUP_TIMEOUT_MS = settings.get_int("MONGODB_STARTUP_TIMEOUT_MS", 1000)
 
 # Global database connection
 client = None
 db = None
 
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so pool usage can be reported without querying the server"""
+
+    def __init__(self):
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checked_in = 0
+        self.check_out_failed = 0
+        self.pool_cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pool_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.check_out_failed += 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_in += 1
+
+    def stats(self) -> dict:
+        return {
+            "max_pool_size": MONGODB_MAX_POOL_SIZE,
+            "open_connections": self.created - self.closed,
+            "in_use": self.checked_out - self.checked_in,
+            "created": self.created,
+            "check_outs": self.checked_out,
+            "check_out_failures": self.check_out_failed,
+            "pool_cleared": self.pool_cleared,
+        }
+
+
+pool_stats = PoolStatsListener()
+
+
+def _database_name(uri: str) -> str:
+    """Extract database name from URI or use default"""
+    path = uri.split("://", 1)[-1].split("?", 1)[0]
+    db_name = path.split("/", 1)[1] if "/" in path else ""
+    return db_name or "foundrmate"
+
+
+def _create_client(uri: str):
+    if uri.startswith("mongomock://"):
+        # In-process stand-in for local development and tests (pip install mongomock-motor)
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError as e:
+            raise RuntimeError("MONGODB_URI uses mongomock:// but mongomock-motor is not installed") from e
+        return AsyncMongoMockClient()
+
+    # mongodb+srv:// (Atlas) URIs enable TLS by default; local URIs connect without it
+    return AsyncIOMotorClient(
+        uri,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS,
+        waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        compressors=MONGODB_COMPRESSORS or None,
+        event_listeners=[pool_stats],
+    )
+
+
 async def connect_db():
     """Connect to MongoDB"""
     global client, db
-    # MongoDB connection disabled
-    # try:
-    #     # Check if URI is for MongoDB Atlas (cloud) or local
-    #     is_atlas = "mongodb+srv://" in MONGODB_URI or "mongodb.net" in MONGODB_URI
-    #     
-    #     if is_atlas:
-    #         # Use TLS for MongoDB Atlas
-    #         client = AsyncIOMotorClient(
-    #             MONGODB_URI,
-    #             tls=True,
-    #             tlsAllowInvalidCertificates=False,
-    #             tlsCAFile=None,
-    #             tlsVersion=ssl.PROTOCOL_TLSv1_2
-    #         )
-    #     else:
-    #         # No TLS for local MongoDB
-    #         client = AsyncIOMotorClient(MONGODB_URI)
-    #     
-    #     # Extract database name from URI or use default
-    #     if "/" in MONGODB_URI.rsplit("?", 1)[0]:
-    #         db_name = MONGODB_URI.rsplit("/", 1)[-1].split("?")[0]
-    #         if not db_name or db_name == MONGODB_URI:
-    #             db_name = "foundrmate"
-    #     else:
-    #         db_name = "foundrmate"
-    #     db = client[db_name]
-    #     # Test connection
-    #     await client.admin.command('ping')
-    #     print("✅ MongoDB connected successfully")
-    #     return db
-    # except Exception as e:
-    #     print(f"❌ MongoDB connection error: {e}")
-    #     raise
-    db = None
-    client = None
-    return None
+    try:
+        client = _create_client(MONGODB_URI)
+        db = client[_database_name(MONGODB_URI)]
+        # Test connection; when MongoDB is required, wait for the full server selection timeout
+        startup_timeout = None if MONGODB_REQUIRED else MONGODB_STARTUP_TIMEOUT_MS / 1000
+        await asyncio.wait_for(client.admin.command('ping'), timeout=startup_timeout)
+        logger.info("MongoDB connected")
+        return db
+    except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
+            logger.error("MongoDB connection error: no answer within %dms, starting without it", MONGODB_STARTUP_TIMEOUT_MS)
+        else:
+            logger.error("MongoDB connection error: %s", e)
+        if client is not None:
+            client.close()
+        client = None
+        db = None
+        if MONGODB_REQUIRED:
+            raise
+        return None
+
 
 async def close_db():
     """Close MongoDB connection"""
-    global client
-    if client:
+    global client, db
+    if client is not None:
         client.close()
+    client = None
+    db = None
+
 
 def get_db():
     """Get database instance"""
     return db
 
+
+async def db_health() -> dict:
+    """Ping MongoDB and report round-trip time and connection pool stats"""
+    if client is None:
+        return {"connected": False, "pool": pool_stats.stats()}
+    started = time.perf_counter()
+    try:
+        await client.admin.command('ping')
+        return {
+            "connected": True,
+            "ping_ms": round((time.perf_counter() - started) * 1000, 2),
+            "pool": pool_stats.stats(),
+        }
+    except Exception as e:
+        return {"connected": False, "error": str(e), "pool": pool_stats.stats()}
@@ -0,0 +1,43 @@
+"""
+Operator debug routes
+Admin-only (X-Admin-Token) diagnostics for a live worker.
+"""
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from auth import require_admin
+from loop_monitor import loop_monitor
+from profiler import profiler, ProfilerBusy, PROFILE_MAX_SECONDS
+
+router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(require_admin)])
+
+@router.get("/loop")
+async def event_loop_stalls(limit: int = Query(10, ge=1, le=100)):
+    """Event loop lag, stall counts and the worst blocking call sites with their stacks"""
+    return loop_monitor.stats(limit)
+
+@router.post("/loop/reset")
+async def reset_event_loop_stalls():
+    """Clear stall counts, e.g. before a staging load test"""
+    loop_monitor.reset()
+    return {"success": True}
+
+@router.get("/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$")
+):
+    """
+    Sample every thread of this worker for N seconds.
+    collapsed: flamegraph.pl / speedscope text; speedscope: JSON for https://www.speedscope.app
+    """
+    try:
+        profile = await asyncio.to_thread(profiler.run, seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "speedscope":
+        return JSONResponse(
+            profile.to_speedscope(),
+            headers={"Content-Disposition": f'attachment; filename="profile-{int(profile.started)}.speedscope.json"'}
+        )
+    return PlainTextResponse(profile.to_collapsed())
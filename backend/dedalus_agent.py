@@ -2,27 +2,201 @@
 Dedalus Agent Module
 Handles business idea research using the Dedalus API
 """
-from dedalus_labs import AsyncDedalus, DedalusRunner
-from dotenv import load_dotenv
-import os
+from settings import settings
+from mcp_selection import DEFAULT_MCP_SERVERS, record_mcp_run
+from ttl_cache import TTLCache
+from single_flight import SingleFlight, make_key
+from bulkhead import BulkheadFull, get_bulkhead
+from metrics import time_stage, CACHE_EVENTS, FALLBACKS
+from tracing import span
+from cassettes import through_cassette, cassette_key
+from types import SimpleNamespace
+import asyncio
+import hashlib
+import logging
 
-load_dotenv()
 
-async def research_business_idea(user_input: str, location: str = None) -> dict:
+logger = logging.getLogger(__name__)
+
+# Per-agent deadlines for a Dedalus run, in seconds
+AGENT_TIMEOUT_SECONDS = settings.get_float("AGENT_TIMEOUT_SECONDS", 120)
+AGENT_TIMEOUTS = {
+    "legal": settings.get_float("LEGAL_AGENT_TIMEOUT_SECONDS", AGENT_TIMEOUT_SECONDS),
+    "financial": settings.get_float("FINANCIAL_AGENT_TIMEOUT_SECONDS", AGENT_TIMEOUT_SECONDS),
+}
+
+# Completed research, served when a later run for the same inputs misses its deadline
+_research_cache = TTLCache(
+    maxsize=settings.get_int("RESEARCH_CACHE_SIZE", 256),
+    ttl=settings.get_float("RESEARCH_CACHE_TTL_SECONDS", 3600)
+)
+
+# dedalus_labs is imported on the first agent run (see _dedalus_classes)
+AsyncDedalus = None
+DedalusRunner = None
+
+# Identical agent runs in flight at the same time share one Dedalus run
+_dedalus_flight = SingleFlight("dedalus")
+
+
+def research_cache_key(agent: str, message: str, location: str = None, budget: str = None) -> str:
+    """Build the research cache key for an agent from the user's original inputs"""
+    normalized = "\x1f".join(" ".join((part or "").lower().split()) for part in (agent, message, location, budget))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def get_cached_research(cache_key: str):
+    """Return cached research results for a cache key, if any"""
+    return _research_cache.get(cache_key) if cache_key else None
+
+
+def _encode_run_result(result) -> dict:
+    tools_called = getattr(result, "tools_called", None)
+    tool_results = getattr(result, "tool_results", None)
+    return {
+        "final_output": result.final_output,
+        "tools_called": [str(tool) for tool in tools_called] if tools_called is not None else None,
+        # Only what MCP server stats need; tool outputs can be large
+        "tool_results": [
+            {key: record[key] for key in ("name", "duration", "duration_ms") if key in record}
+            for record in tool_results if isinstance(record, dict)
+        ] if tool_results is not None else None,
+        "steps_used": getattr(result, "steps_used", None),
+    }
+
+
+def _decode_run_result(data: dict):
+    return SimpleNamespace(**data)
+
+
+def _dedalus_classes():
+    global AsyncDedalus, DedalusRunner
+    if DedalusRunner is None:
+        from dedalus_labs import AsyncDedalus, DedalusRunner
+    return AsyncDedalus, DedalusRunner
+
+
+# One Dedalus client (and its HTTP connection pool) shared by every run
+_dedalus_client = None
+
+
+def get_dedalus_client():
+    global _dedalus_client
+    if _dedalus_client is None:
+        AsyncDedalus, _ = _dedalus_classes()
+        _dedalus_client = AsyncDedalus()
+    return _dedalus_client
+
+
+async def warm_dedalus() -> dict:
+    """Import the SDK and build the shared client ahead of the first agent run"""
+    client = get_dedalus_client()
+    return {"client": type(client).__name__}
+
+
+async def close_dedalus_client():
+    global _dedalus_client
+    client, _dedalus_client = _dedalus_client, None
+    close = getattr(client, "close", None)
+    if close is not None:
+        result = close()
+        if asyncio.iscoroutine(result):
+            await result
+
+
+async def _runner_run(formatted_input: str, servers: list):
+    _, DedalusRunner = _dedalus_classes()
+    runner = DedalusRunner(get_dedalus_client())
+    return await runner.run(
+        input=formatted_input,
+        model="openai/gpt-4.1",
+        mcp_servers=servers
+    )
+
+
+async def _dedalus_run(formatted_input: str, servers: list):
+    with span("dedalus.run", model="openai/gpt-4.1", mcp_servers=",".join(servers)) as run_span:
+        async with get_bulkhead("dedalus").acquire():
+            result = await through_cassette(
+                "dedalus",
+                cassette_key("dedalus", "openai/gpt-4.1", formatted_input, sorted(servers)),
+                lambda: _runner_run(formatted_input, servers),
+                _encode_run_result,
+                _decode_run_result,
+                request_summary={"model": "openai/gpt-4.1", "mcp_servers": servers},
+            )
+        tools_called = getattr(result, "tools_called", None)
+        run_span.set(
+            tools_called=len(tools_called) if tools_called is not None else None,
+            steps_used=getattr(result, "steps_used", None),
+            output_chars=len(result.final_output or "")
+        )
+        return result
+
+
+async def _run_agent(agent: str, formatted_input: str, mcp_servers: list, parsed_intent: dict, cache_key: str, timeout: float = None) -> dict:
+    """
+    Run a Dedalus agent under a deadline.
+    When the deadline expires the run is cancelled and the result is marked partial,
+    carrying the cached research for the same inputs when there is one.
+    """
+    timeout = AGENT_TIMEOUTS.get(agent, AGENT_TIMEOUT_SECONDS) if timeout is None else timeout
+    servers = mcp_servers or DEFAULT_MCP_SERVERS
+
+    try:
+        with time_stage(f"dedalus_{agent}"):
+            result = await asyncio.wait_for(
+                _dedalus_flight.do(
+                    make_key("openai/gpt-4.1", formatted_input, servers),
+                    _dedalus_run,
+                    formatted_input,
+                    servers
+                ),
+                timeout=timeout
+            )
+    except asyncio.TimeoutError:
+        record_mcp_run(agent, parsed_intent, servers)
+        cached = get_cached_research(cache_key)
+        CACHE_EVENTS.inc(cache="research", result="hit" if cached else "miss")
+        FALLBACKS.inc(kind=f"{agent}_partial")
+        logger.warning("%s agent timed out after %ss (cached result: %s)", agent, timeout, cached is not None)
+        return {
+            "success": True,
+            "research_results": cached or "",
+            "mcp_servers": servers,
+            "partial": True,
+            "source": "cache" if cached else None,
+            "error": f"{agent} research timed out after {timeout:g}s",
+            "status": "partial"
+        }
+
+    record_mcp_run(agent, parsed_intent, servers, result)
+    if cache_key and result.final_output:
+        _research_cache.set(cache_key, result.final_output)
+
+    return {
+        "success": True,
+        "research_results": result.final_output,
+        "mcp_servers": servers,
+        "status": "completed"
+    }
+
+
+async def research_business_idea(user_input: str, location: str = None, mcp_servers: list = None, parsed_intent: dict = None, cache_key: str = None) -> dict:
     """
     Research legal requirements for a business idea using the Dedalus agent.
     
     Args:
         user_input: The business idea description from the user
         location: Optional location information (city, state, country)
+        mcp_servers: MCP servers to attach (defaults to all of them)
+        parsed_intent: Parsed intent, used to record per-industry MCP server stats
+        cache_key: Research cache key (see research_cache_key) used for timeout fallback
         
     Returns:
-        dict: Contains the research results and status
+        dict: Contains the research results and status ("partial" when the deadline expired)
     """
     try:
-        client = AsyncDedalus()
-        runner = DedalusRunner(client)
-
         location_context = ""
         if location:
             location_context = f"\n\nIMPORTANT: The business will be located in {location}. Please research location-specific requirements, regulations, and agencies for this area."
@@ -45,21 +219,9 @@ IMPORTANT LINK GUIDELINES:
 - Format: Use full URLs starting with https://
 """
 
-        result = await runner.run(
-            input=formatted_input,
-            model="openai/gpt-4.1",
-            mcp_servers=[
-                "windsor/brave-search-mcp",   # General legal and regulation search
-                "joerup/exa-mcp",             # Semantic web research
-                "windsor/gov-info-mcp"        # U.S. government info and permit resources
-            ]
-        )
-
-        return {
-            "success": True,
-            "research_results": result.final_output,
-            "status": "completed"
-        }
+        return await _run_agent("legal", formatted_input, mcp_servers, parsed_intent, cache_key)
+    except BulkheadFull:
+        raise
     except Exception as e:
         return {
             "success": False,
@@ -67,7 +229,7 @@ IMPORTANT LINK GUIDELINES:
             "status": "failed"
         }
 
-async def research_financial_planning(user_input: str, budget: str, location: str = None) -> dict:
+async def research_financial_planning(user_input: str, budget: str, location: str = None, mcp_servers: list = None, parsed_intent: dict = None, cache_key: str = None) -> dict:
     """
     Research financial planning and funding options for a business idea using the Dedalus agent.
     
@@ -75,14 +237,14 @@ async def research_financial_planning(user_input: str, budget: str, location: st
         user_input: The business idea description from the user
         budget: Budget range provided by the user
         location: Optional location information (city, state, country)
+        mcp_servers: MCP servers to attach (defaults to all of them)
+        parsed_intent: Parsed intent, used to record per-industry MCP server stats
+        cache_key: Research cache key (see research_cache_key) used for timeout fallback
         
     Returns:
-        dict: Contains the research results and status
+        dict: Contains the research results and status ("partial" when the deadline expired)
     """
     try:
-        client = AsyncDedalus()
-        runner = DedalusRunner(client)
-
         budget_map = {
             "under-10k": "under $10,000",
             "10k-50k": "$10,000 - $50,000",
@@ -119,21 +281,9 @@ IMPORTANT LINK GUIDELINES:
 - Format: Use full URLs starting with https://
 """
 
-        result = await runner.run(
-            input=formatted_input,
-            model="openai/gpt-4.1",
-            mcp_servers=[
-                "windsor/brave-search-mcp",   # for live cost estimates and financial info
-                "joerup/exa-mcp",             # semantic search for funding resources
-                "windsor/gov-info-mcp"        # for SBA loans, grants, government programs
-            ]
-        )
-
-        return {
-            "success": True,
-            "research_results": result.final_output,
-            "status": "completed"
-        }
+        return await _run_agent("financial", formatted_input, mcp_servers, parsed_intent, cache_key)
+    except BulkheadFull:
+        raise
     except Exception as e:
         return {
             "success": False,
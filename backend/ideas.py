@@ -0,0 +1,41 @@
+"""
+Idea history routes
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from database import get_db
+from models.idea import Idea
+from auth import get_current_user
+
+router = APIRouter(prefix="/api/ideas", tags=["ideas"])
+
+def _idea_model() -> Idea:
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    return Idea(db)
+
+@router.get("")
+async def list_ideas(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    """List the current user's ideas, newest first, with cursor-based pagination"""
+    try:
+        ideas, next_cursor = await _idea_model().list_for_user(current_user["id"], cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "success": True,
+        "ideas": ideas,
+        "next_cursor": next_cursor
+    }
+
+@router.get("/{idea_id}")
+async def get_idea(idea_id: str, current_user: dict = Depends(get_current_user)):
+    """Get one idea with its full legal/financial/synthesized result"""
+    idea = await _idea_model().find_for_user(idea_id, current_user["id"])
+    if not idea:
+        raise HTTPException(status_code=404, detail="Idea not found")
+    return {"success": True, "idea": idea}
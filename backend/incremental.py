@@ -0,0 +1,53 @@
+"""
+Incremental Re-Runs
+Which request inputs each pipeline stage depends on, so a resubmission that only changes the
+budget or location (sent with previous_result_id) reuses the still-valid stages of the earlier
+result instead of recomputing everything.
+
+A stage can be reused when none of its inputs changed and all of its upstream stages were
+reused. Orchestration puts the budget and location into its prompt, and its enhanced_prompts
+are passed on to the agents, so a budget or location change re-runs it and every later stage;
+only intent parsing is reused then.
+"""
+from typing import Dict, Optional, Set
+from single_flight import make_key
+
+# stage -> (request inputs, upstream stages); listed in pipeline order
+PIPELINE_STAGES = {
+    "parse_intent": (("message",), ()),
+    "orchestration": (("message", "budget", "location"), ("parse_intent",)),
+    "legal": (("message", "location"), ("parse_intent", "orchestration")),
+    "financial": (("message", "budget", "location"), ("parse_intent", "orchestration")),
+    "synthesis": (("message", "budget", "location"), ("legal", "financial")),
+}
+
+# Request input -> key it is echoed under in a pipeline result
+RESULT_INPUTS = {"message": "received_idea", "budget": "budget", "location": "location"}
+
+
+def changed_inputs(previous: Dict, inputs: Dict) -> Set[str]:
+    """Inputs that differ from the previous result, ignoring case, whitespace and empty values"""
+    return {
+        name for name, result_key in RESULT_INPUTS.items()
+        if make_key(previous.get(result_key) or None) != make_key(inputs.get(name) or None)
+    }
+
+
+def reusable_stages(previous: Optional[Dict], inputs: Dict) -> Set[str]:
+    """Stages of a previous result that are still valid for these inputs"""
+    if not previous or previous.get("status") not in ("completed", "partial"):
+        return set()
+    changed = changed_inputs(previous, inputs)
+    reusable = set()
+    for stage, (stage_inputs, upstream) in PIPELINE_STAGES.items():
+        if changed.isdisjoint(stage_inputs) and all(name in reusable for name in upstream):
+            reusable.add(stage)
+    return reusable
+
+
+def previous_section(previous: Optional[Dict], name: str) -> Optional[Dict]:
+    """A previous agent section worth reusing: complete, with research text"""
+    section = (previous or {}).get(name)
+    if not isinstance(section, dict) or section.get("partial") or not section.get("raw"):
+        return None
+    return section
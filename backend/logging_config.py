@@ -0,0 +1,135 @@
+"""
+Logging Configuration
+Structured (JSON lines) logging through a queue, so the event loop only enqueues records and a
+background thread does the formatting-to-stdout I/O. Large payloads are logged through payload(),
+which truncates lazily, and payload records can be sampled.
+
+Environment:
+    LOG_LEVEL                 root level (default INFO)
+    LOG_LEVELS                per-logger levels, e.g. "snowflake_service=DEBUG,dedalus_agent=WARNING"
+    LOG_FORMAT                "json" (default) or "text"
+    LOG_MAX_PAYLOAD_CHARS     max characters of a logged payload (default 500)
+    LOG_PAYLOAD_SAMPLE_RATE   fraction of payload records kept (default 1.0)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import reprlib
+import sys
+import time
+from settings import settings
+from tracing import current_trace_id
+
+
+LOG_LEVEL = settings.get_str("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = settings.get_str("LOG_LEVELS", "")
+LOG_FORMAT = settings.get_str("LOG_FORMAT", "json").lower()
+LOG_MAX_PAYLOAD_CHARS = settings.get_int("LOG_MAX_PAYLOAD_CHARS", 500)
+LOG_PAYLOAD_SAMPLE_RATE = settings.get_float("LOG_PAYLOAD_SAMPLE_RATE", 1.0)
+
+# Pass as extra= on records that carry a large body, so they can be sampled
+PAYLOAD = {"payload": True}
+
+_payload_repr = reprlib.Repr()
+_payload_repr.maxstring = LOG_MAX_PAYLOAD_CHARS
+_payload_repr.maxother = LOG_MAX_PAYLOAD_CHARS
+_payload_repr.maxdict = 20
+_payload_repr.maxlist = 20
+_payload_repr.maxlevel = 4
+
+
+class payload:
+    """Wraps a large value for logging; it is only rendered (and truncated) if the record is emitted"""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        if isinstance(self.value, str):
+            if len(self.value) <= LOG_MAX_PAYLOAD_CHARS:
+                return self.value
+            return f"{self.value[:LOG_MAX_PAYLOAD_CHARS]}... [{len(self.value)} chars]"
+        return _payload_repr.repr(self.value)
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds the current trace id as request_id and samples payload records"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "payload", False) and LOG_PAYLOAD_SAMPLE_RATE < 1.0:
+            if random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+                return False
+        record.request_id = current_trace_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _PreparedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that only renders the message (not the full formatted line) on the caller's thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Install the queue-based handler on the root logger; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _PreparedQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
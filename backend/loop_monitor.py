@@ -0,0 +1,191 @@
+"""
+Event Loop Monitor
+Opt-in watchdog for blocking calls on the asyncio loop. A heartbeat coroutine measures loop lag;
+a watchdog thread notices when the heartbeat is late and captures the loop thread's stack while
+it is still blocked, so the offending function (bcrypt, ReportLab, the Snowflake connector, ...)
+is named directly instead of inferred from latency.
+
+LOOP_MONITOR_ENABLED turns it on; LOOP_STALL_THRESHOLD_SECONDS sets what counts as a stall.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+from settings import settings
+from metrics import registry
+from logging_config import payload
+
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_ENABLED = settings.get_bool("LOOP_MONITOR_ENABLED", False)
+# How often the heartbeat runs, in seconds
+LOOP_MONITOR_INTERVAL_SECONDS = settings.get_float("LOOP_MONITOR_INTERVAL_SECONDS", 0.05)
+# A callback holding the loop longer than this is reported as a stall
+LOOP_STALL_THRESHOLD_SECONDS = settings.get_float("LOOP_STALL_THRESHOLD_SECONDS", 0.1)
+# Frames kept per captured stack
+LOOP_STALL_STACK_DEPTH = 25
+
+LOOP_LAG_SECONDS = registry.histogram(
+    "foundrmate_event_loop_lag_seconds",
+    "How late the event loop heartbeat ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+LOOP_STALLS = registry.counter("foundrmate_event_loop_stalls_total", "Event loop stalls by offending function")
+
+_APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _offender(frames: List[traceback.FrameSummary]) -> str:
+    """Innermost frame in application code, or the innermost frame when the stack has none"""
+    for frame in reversed(frames):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(_APP_ROOT) and os.path.basename(filename) != "loop_monitor.py":
+            return f"{os.path.relpath(filename, _APP_ROOT)}:{frame.lineno} in {frame.name}"
+    if frames:
+        frame = frames[-1]
+        return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id = None
+        self._heartbeat_task = None
+        self._watchdog = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._beat = 0
+        self._captured_beat = -1
+        self._pending = None  # (offender, stack, task) captured during the current stall
+        self.stalls = 0
+        self.max_lag_seconds = 0.0
+        self.last_lag_seconds = 0.0
+        self._offenders: Dict[str, Dict] = {}
+        self._recent = deque(maxlen=20)
+
+    @property
+    def running(self) -> bool:
+        return self._heartbeat_task is not None
+
+    def start(self):
+        """Start monitoring the running loop"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        logger.info("Event loop monitor started (threshold %.0f ms)", self.threshold * 1000)
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._stopping.set()
+        self._heartbeat_task.cancel()
+        try:
+            await self._heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat_task = None
+        self._watchdog.join(timeout=1)
+        self._watchdog = None
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            LOOP_LAG_SECONDS.observe(lag)
+            with self._lock:
+                self._last_beat = now
+                self._beat += 1
+                self.last_lag_seconds = lag
+                self.max_lag_seconds = max(self.max_lag_seconds, lag)
+                pending, self._pending = self._pending, None
+            if lag >= self.threshold:
+                self._record_stall(lag, pending)
+
+    def _watch(self):
+        """Watchdog thread: grab the loop thread's stack while the heartbeat is overdue"""
+        poll = min(self.interval, self.threshold) / 2
+        while not self._stopping.wait(poll):
+            with self._lock:
+                overdue = time.monotonic() - self._last_beat - self.interval
+                beat = self._beat
+                if overdue < self.threshold or self._captured_beat == beat:
+                    continue
+                self._captured_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            frames = traceback.extract_stack(frame, limit=LOOP_STALL_STACK_DEPTH)
+            task = asyncio.current_task(self._loop)
+            with self._lock:
+                self._pending = (_offender(frames), frames.format(), task.get_name() if task else None)
+
+    def _record_stall(self, lag: float, pending):
+        """Attribute a finished stall to the stack captured while it was happening"""
+        if pending is None:
+            # Shorter than the watchdog's poll, or the stack was not captured in time
+            pending = ("uncaptured", [], None)
+        offender, stack, task_name = pending
+        self.stalls += 1
+        LOOP_STALLS.inc(offender=offender)
+        entry = self._offenders.get(offender)
+        if entry is None:
+            entry = self._offenders[offender] = {
+                "offender": offender, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "stack": stack
+            }
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + lag * 1000, 2)
+        if lag * 1000 >= entry["max_ms"]:
+            entry["max_ms"] = round(lag * 1000, 2)
+            entry["stack"] = stack or entry["stack"]
+        self._recent.append({
+            "at": time.time(),
+            "duration_ms": round(lag * 1000, 2),
+            "offender": offender,
+            "task": task_name,
+        })
+        logger.warning(
+            "Event loop blocked for %.0f ms by %s\n%s",
+            lag * 1000, offender, payload("".join(stack))
+        )
+
+    def offenders(self, limit: int = 10) -> List[Dict]:
+        """Worst offenders by total blocked time"""
+        return sorted(self._offenders.values(), key=lambda entry: entry["total_ms"], reverse=True)[:limit]
+
+    def reset(self):
+        self.stalls = 0
+        self.max_lag_seconds = 0.0
+        self._offenders.clear()
+        self._recent.clear()
+
+    def stats(self, limit: int = 10) -> Dict:
+        return {
+            "enabled": self.running,
+            "threshold_ms": round(self.threshold * 1000, 2),
+            "stalls": self.stalls,
+            "last_lag_ms": round(self.last_lag_seconds * 1000, 2),
+            "max_lag_ms": round(self.max_lag_seconds * 1000, 2),
+            "offenders": self.offenders(limit),
+            "recent": list(self._recent),
+        }
+
+
+loop_monitor = LoopMonitor(interval=LOOP_MONITOR_INTERVAL_SECONDS, threshold=LOOP_STALL_THRESHOLD_SECONDS)
@@ -1,26 +1,78 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, ORJSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from contextlib import asynccontextmanager
-from dedalus_agent import research_business_idea, research_financial_planning
-from snowflake_service import parse_intent, format_response, orchestrate_agents, synthesize_responses, generate_complete_business_brief
-from pdf_generator import create_business_brief_pdf_from_structured, generate_pdf_filename
-from transcription_service import transcribe_audio_from_bytes
-from database import connect_db, close_db
-from auth import router as auth_router
-import os
+from dedalus_agent import research_business_idea, research_financial_planning, research_cache_key, get_cached_research, close_dedalus_client
+from snowflake_service import parse_intent, format_response, orchestrate_agents, synthesize_responses, generate_complete_business_brief, close_cortex_client
+from transcription_service import transcribe_audio_from_bytes, close_sessions
+from warmup import readiness
+from mcp_selection import select_mcp_servers, get_mcp_stats
+from single_flight import SingleFlight, make_key, single_flight_stats
+from bulkhead import BulkheadFull, bulkhead_stats
+from agent_scheduler import agent_scheduler, AgentSkipped, PRIORITY_RANK, normalize_priority
+from overload import overload_controller
+from metrics import time_stage, render_metrics, registry, RequestMetricsMiddleware, IN_FLIGHT, FALLBACKS, CACHE_EVENTS
+from tracing import TraceMiddleware
+from database import connect_db, close_db, get_db, db_health
+from models.user import User
+from auth import router as auth_router, get_optional_user
+from ideas import router as ideas_router
+from results import router as results_router, parse_fields, select_fields, remember_result, load_result
+from incremental import reusable_stages, previous_section
+from batch import run_batch, BATCH_MAX_ITEMS
+from debug import router as debug_router
+from loop_monitor import loop_monitor, LOOP_MONITOR_ENABLED
+from models.idea import Idea
+from write_behind import write_behind
+from cassettes import cassette_stats
+from settings import settings
+from logging_config import setup_logging, payload, PAYLOAD
+from compression import CompressionMiddleware
+import asyncio
+import logging
+import time
+import orjson
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# How often a running /api/submit pipeline checks whether the client is still connected
+DISCONNECT_POLL_SECONDS = settings.get_float("DISCONNECT_POLL_SECONDS", 0.5)
+
+# Identical ideas submitted concurrently share one pipeline execution
+pipeline_flight = SingleFlight("pipeline")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    db = await connect_db()
+    if db is not None:
+        await User.ensure_indexes(db)
+        await Idea.ensure_indexes(db)
+    await write_behind.start()
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    # Warm upstream connections in the background; /ready reports 503 until this finishes
+    warmup_task = asyncio.create_task(readiness.warm_up())
     yield
+    warmup_task.cancel()
+    await loop_monitor.stop()
+    await write_behind.stop()
+    await close_cortex_client()
+    await close_dedalus_client()
+    await close_sessions()
+    await close_db()
    
 
-app = FastAPI(title="FoundrMate API", version="1.0.0", lifespan=lifespan)
+# orjson serializes the large research payloads several times faster than the stdlib encoder
+app = FastAPI(title="FoundrMate API", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
-# Include auth routes
+# Include auth, idea history, raw result and operator debug routes
 app.include_router(auth_router)
+app.include_router(ideas_router)
+app.include_router(results_router)
+app.include_router(debug_router)
 
 # CORS configuration to allow frontend to call the backend
 app.add_middleware(
@@ -29,13 +81,52 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
 
+# gzip/brotli for large bodies (full research results run 50-100 KB of JSON)
+app.add_middleware(CompressionMiddleware)
+
+# One trace per request, ended after streamed bodies finish
+app.add_middleware(TraceMiddleware)
+
+# Request duration and in-flight metrics, outermost so they cover every other middleware
+app.add_middleware(RequestMetricsMiddleware)
+
+def collect_component_gauges():
+    """Refresh gauges for bulkheads, the agent scheduler, overload mode and write-behind backlog"""
+    for name, stats in bulkhead_stats().items():
+        IN_FLIGHT.set(stats["active"], kind=f"bulkhead_{name}")
+        IN_FLIGHT.set(stats["queued"], kind=f"bulkhead_{name}_queued")
+    scheduler_stats = agent_scheduler.stats()
+    IN_FLIGHT.set(scheduler_stats["active"], kind="agent_runs")
+    IN_FLIGHT.set(sum(scheduler_stats["waiting"].values()), kind="agent_runs_waiting")
+    IN_FLIGHT.set(write_behind.stats()["backlog"], kind="write_behind_backlog")
+
+registry.add_collector(collect_component_gauges)
+
+@app.exception_handler(BulkheadFull)
+async def bulkhead_full_handler(request: Request, exc: BulkheadFull):
+    """A saturated upstream bulkhead fails the request fast with 503 + Retry-After"""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "message": f"Service busy: {exc}"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Request model for the submit endpoint
 class BusinessIdeaRequest(BaseModel):
     message: str
     budget: Optional[str] = None
     location: Optional[str] = None
+    # Id of an earlier result for the same idea; its still-valid stages are reused (see incremental.py)
+    previous_result_id: Optional[str] = None
+    # That result's result_token; not needed when the signed-in user owns it
+    previous_result_token: Optional[str] = None
+
+# Request model for the batch submit endpoint
+class BusinessIdeaBatchRequest(BaseModel):
+    ideas: List[BusinessIdeaRequest]
 
 # Response model
 class BusinessIdeaResponse(BaseModel):
@@ -56,8 +147,62 @@ class BusinessBriefRequest(BaseModel):
 async def root():
     return {"message": "FoundrMate API is running"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Load balancer readiness: 200 once the warm-up has finished, 503 before"""
+    return JSONResponse(status_code=200 if readiness.ready else 503, content=readiness.stats())
+
+@app.get("/api/health/db")
+async def database_health():
+    """MongoDB connectivity, ping latency and connection pool stats"""
+    health = await db_health()
+    return JSONResponse(status_code=200 if health["connected"] else 503, content=health)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus text exposition of pipeline metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/stats")
+async def get_stats():
+    """Runtime stats for upstream bulkheads, agent scheduling, request coalescing and MCP server selection"""
+    return {
+        "bulkheads": bulkhead_stats(),
+        "agent_scheduler": agent_scheduler.stats(),
+        "overload": overload_controller.stats(),
+        "write_behind": write_behind.stats(),
+        "single_flight": single_flight_stats(),
+        "cassettes": cassette_stats.stats(),
+        "mcp_servers": get_mcp_stats()
+    }
+
+async def run_until_disconnected(http_request: Request, coro):
+    """
+    Await a coroutine, cancelling it if the client disconnects first.
+    Returns None when the client went away.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected, cancelling pipeline")
+                task.cancel()
+                return None
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 @app.post("/api/submit", response_model=BusinessIdeaResponse)
-async def submit_business_idea(request: BusinessIdeaRequest):
+async def submit_business_idea(
+    request: BusinessIdeaRequest,
+    http_request: Request,
+    fields: Optional[str] = None,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
     """
     Receives a business idea from the frontend and processes it using Snowflake orchestration:
     1. Parses intent using Snowflake
@@ -68,46 +213,254 @@ async def submit_business_idea(request: BusinessIdeaRequest):
     4. Formats agent responses using Snowflake
     5. Synthesizes combined response using Snowflake (creates unified business plan)
     6. Returns structured response with legal, financial, and synthesized plan data
+
+    Agent runs that miss their deadline are returned marked as partial, and the whole
+    pipeline is cancelled if the client disconnects. Concurrent identical submissions
+    (same normalized message, budget and location) attach to one pipeline execution.
+    Under overload the pipeline runs degraded (see overload.py) or is rejected with 503.
+
+    With previous_result_id (and its previous_result_token, unless the signed-in user owns it),
+    only the stages invalidated by the changed inputs are re-run.
+    fields limits the returned data to the listed parts, e.g. "legal.formatted,synthesized_plan"
+    (see results.py); omitted raw research text is then available from the section's raw_url.
     """
     try:
-        # Step 1: Parse intent using Snowflake
-        parsed_intent = await parse_intent(request.message)
-        print("Parsed intent:", parsed_intent)
-        
-        # Step 2: Use Snowflake to orchestrate agent routing
-        orchestration = await orchestrate_agents(
+        field_paths = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    previous = None
+    if request.previous_result_id:
+        previous = await load_result(request.previous_result_id, request.previous_result_token, current_user)
+        if previous is None:
+            logger.info("Previous result %s not found; running the full pipeline", request.previous_result_id)
+    degradations = overload_controller.admit()
+    started_at = time.perf_counter()
+    key = make_key(request.message, request.budget, request.location, request.previous_result_id if previous else None)
+    response = await run_until_disconnected(
+        http_request,
+        pipeline_flight.do(key, process_business_idea, request, degradations, previous)
+    )
+    if response is None:
+        return JSONResponse(status_code=499, content={"success": False, "message": "Client disconnected"})
+    overload_controller.record_latency(time.perf_counter() - started_at)
+
+    if response.success and response.data:
+        # Persisted by the write-behind buffer, off the request path
+        user_id = current_user["id"] if current_user else None
+        idea, idea_result = Idea.build_documents(
+            user_id,
+            request.message,
+            request.budget,
+            request.location,
+            result=response.data,
+            status=response.data.get("status", "completed")
+        )
+        write_behind.insert("ideas", idea)
+        write_behind.insert("idea_results", idea_result)
+        write_behind.push_user_idea(user_id, idea["_id"])
+        remember_result(str(idea["_id"]), user_id, idea_result["accessToken"], response.data)
+        # Coalesced callers share the pipeline response, so give each its own copy
+        data = {**response.data, "idea_id": str(idea["_id"]), "result_token": idea_result["accessToken"]}
+        response = response.model_copy(update={"data": select_fields(data, field_paths)})
+    # Already a validated BusinessIdeaResponse; skip FastAPI's second validation pass
+    return ORJSONResponse(response.model_dump())
+
+
+@app.post("/api/submit/batch")
+async def submit_business_ideas(batch: BusinessIdeaBatchRequest, current_user: Optional[dict] = Depends(get_optional_user)):
+    """
+    Process many business ideas at once (see batch.py), streaming one NDJSON line per idea as it
+    completes: {"index", "success", "message", "data"}, where index is the idea's position in the
+    request. Results are saved like single submissions and carry data.idea_id and data.result_token.
+    A failure after streaming has started ends the stream with a line whose index is null.
+    """
+    if not batch.ideas:
+        raise HTTPException(status_code=400, detail="No ideas in the batch")
+    if len(batch.ideas) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} ideas per batch")
+    degradations = overload_controller.admit()
+    user_id = current_user["id"] if current_user else None
+    # Everything that can reject the whole batch happens before the 200 and the stream start
+    try:
+        results = await run_batch(batch.ideas, degradations)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"Error processing batch: {str(e)}")
+
+    def save_item(item: dict) -> dict:
+        if not (item["success"] and item["data"]):
+            return item
+        request = batch.ideas[item["index"]]
+        idea, idea_result = Idea.build_documents(
+            user_id,
             request.message,
             request.budget,
             request.location,
-            parsed_intent
+            result=item["data"],
+            status=item["data"].get("status", "completed")
         )
-        print("Snowflake orchestration:", orchestration)
+        write_behind.insert("ideas", idea)
+        write_behind.insert("idea_results", idea_result)
+        write_behind.push_user_idea(user_id, idea["_id"])
+        remember_result(str(idea["_id"]), user_id, idea_result["accessToken"], item["data"])
+        return {**item, "data": {**item["data"], "idea_id": str(idea["_id"]), "result_token": idea_result["accessToken"]}}
+
+    async def stream_results():
+        try:
+            async for item in results:
+                yield orjson.dumps(save_item(item)) + b"\n"
+        except Exception as e:
+            # The 200 is already sent: end with an error line rather than a silently truncated stream
+            logger.exception("Batch submission failed mid-stream")
+            yield orjson.dumps({"index": None, "success": False, "message": f"Error processing batch: {e}"}) + b"\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+async def process_business_idea(request: BusinessIdeaRequest, degradations: list = None,
+                                previous: dict = None) -> BusinessIdeaResponse:
+    """
+    Run the parse -> orchestrate -> agents -> format -> synthesize pipeline for one idea.
+    degradations lists the overload degradations enabled for this run; the ones that
+    actually changed the result are reported in data["degradations"].
+    previous is an earlier result for the same idea; stages whose inputs did not change are
+    taken from it and reported in data["reused_stages"].
+    """
+    degradations = degradations or []
+    applied_degradations = []
+    reusable = reusable_stages(previous, request.model_dump())
+    reused_stages = []
+    try:
+        # Step 1: Parse intent using Snowflake
+        if "parse_intent" in reusable:
+            parsed_intent = previous["parsed_intent"]
+            reused_stages.append("parse_intent")
+        else:
+            with time_stage("parse_intent"):
+                parsed_intent = await parse_intent(request.message)
+        logger.debug("Parsed intent: %s", payload(parsed_intent), extra=PAYLOAD)
         
-        # Step 3: Route to agents based on Snowflake orchestration
-        legal_result = None
-        financial_result = None
+        # Step 2: Use Snowflake to orchestrate agent routing
+        if "orchestration" in reusable:
+            orchestration = previous["orchestration"]
+            reused_stages.append("orchestration")
+        else:
+            with time_stage("orchestrate_agents"):
+                orchestration = await orchestrate_agents(
+                    request.message,
+                    request.budget,
+                    request.location,
+                    parsed_intent
+                )
+        logger.debug("Snowflake orchestration: %s", payload(orchestration), extra=PAYLOAD)
         
-        # Call legal agent if Snowflake recommends it (or if location is provided as fallback)
-        if orchestration.get("should_call_legal", True) or request.location:
+        # Step 3: Route to agents based on Snowflake orchestration
+        # Both branches run concurrently; the scheduler admits them by orchestration priority
+        # and may skip a low-priority branch when agent capacity is scarce
+        legal_priority = orchestration.get("legal_priority")
+        financial_priority = orchestration.get("financial_priority")
+        skipped_agents = []
+        call_legal = bool(orchestration.get("should_call_legal", True) or request.location)
+        call_financial = bool(orchestration.get("should_call_financial", False) or request.budget)
+
+        # Under high load only the higher-priority branch runs (legal wins ties)
+        if "single_branch" in degradations and call_legal and call_financial:
+            if PRIORITY_RANK[normalize_priority(financial_priority)] < PRIORITY_RANK[normalize_priority(legal_priority)]:
+                call_legal = False
+                skipped_agents.append("legal")
+            else:
+                call_financial = False
+                skipped_agents.append("financial")
+            applied_degradations.append("single_branch")
+            FALLBACKS.inc(kind="single_branch")
+
+        def cached_research(agent: str, cache_key: str):
+            """Serve cached research instead of a new agent run when load calls for it"""
+            if "prefer_cached_research" not in degradations:
+                return None
+            cached = get_cached_research(cache_key)
+            CACHE_EVENTS.inc(cache="research", result="hit" if cached else "miss")
+            if not cached:
+                return None
+            applied_degradations.append(f"cached_{agent}_research")
+            return {"success": True, "research_results": cached, "source": "cache", "status": "completed"}
+
+        def reused_research(agent: str):
+            """The previous result's research for an agent whose inputs did not change"""
+            section = previous_section(previous, agent) if agent in reusable else None
+            if section is None:
+                return None
+            reused_stages.append(agent)
+            return {"success": True, "research_results": section["raw"], "source": "previous_result",
+                    "status": "completed", "formatted": section.get("formatted")}
+
+        async def run_legal_branch():
+            reused = reused_research("legal")
+            if reused:
+                return reused
             legal_prompt_enhancement = orchestration.get("enhanced_prompts", {}).get("legal", "")
             enhanced_message = request.message
             if legal_prompt_enhancement:
                 enhanced_message = f"{request.message}\n\nAdditional context: {legal_prompt_enhancement}"
-            legal_result = await research_business_idea(enhanced_message, request.location)
-            print("Legal agent result:", legal_result)
-        
-        # Call financial agent if Snowflake recommends it OR if budget is provided
-        if orchestration.get("should_call_financial", False) or request.budget:
+            legal_servers = select_mcp_servers("legal", parsed_intent, legal_priority)
+            cache_key = research_cache_key("legal", request.message, request.location)
+            cached = cached_research("legal", cache_key)
+            if cached:
+                return cached
+            try:
+                async with agent_scheduler.slot(legal_priority):
+                    result = await research_business_idea(
+                        enhanced_message,
+                        request.location,
+                        mcp_servers=legal_servers,
+                        parsed_intent=parsed_intent,
+                        cache_key=cache_key
+                    )
+            except AgentSkipped as e:
+                logger.info("Legal agent skipped: %s", e)
+                skipped_agents.append("legal")
+                return None
+            logger.debug("Legal agent result: %s", payload(result), extra=PAYLOAD)
+            return result
+
+        async def run_financial_branch():
+            reused = reused_research("financial")
+            if reused:
+                return reused
             financial_prompt_enhancement = orchestration.get("enhanced_prompts", {}).get("financial", "")
             enhanced_message = request.message
             if financial_prompt_enhancement:
                 enhanced_message = f"{request.message}\n\nAdditional context: {financial_prompt_enhancement}"
-            financial_result = await research_financial_planning(
-                enhanced_message, 
-                request.budget or "not-specified", 
-                request.location
-            )
-            print("Financial agent result:", financial_result)
+            financial_servers = select_mcp_servers("financial", parsed_intent, financial_priority)
+            cache_key = research_cache_key("financial", request.message, request.location, request.budget)
+            cached = cached_research("financial", cache_key)
+            if cached:
+                return cached
+            try:
+                async with agent_scheduler.slot(financial_priority):
+                    result = await research_financial_planning(
+                        enhanced_message, 
+                        request.budget or "not-specified", 
+                        request.location,
+                        mcp_servers=financial_servers,
+                        parsed_intent=parsed_intent,
+                        cache_key=cache_key
+                    )
+            except AgentSkipped as e:
+                logger.info("Financial agent skipped: %s", e)
+                skipped_agents.append("financial")
+                return None
+            logger.debug("Financial agent result: %s", payload(result), extra=PAYLOAD)
+            return result
+
+        async def no_branch():
+            return None
+
+        # Call legal agent if Snowflake recommends it (or if location is provided as fallback)
+        # Call financial agent if Snowflake recommends it OR if budget is provided
+        legal_result, financial_result = await asyncio.gather(
+            run_legal_branch() if call_legal else no_branch(),
+            run_financial_branch() if call_financial else no_branch()
+        )
         
         # Check for errors
         if legal_result and not legal_result["success"]:
@@ -139,38 +492,62 @@ async def submit_business_idea(request: BusinessIdeaRequest):
             )
         
         # Step 4: Format responses using Snowflake
+        # (a partial result that timed out with nothing cached has no research to format)
         formatted_legal = None
-        if legal_result:
-            formatted_legal = await format_response(
-                legal_result["research_results"],
-                "legal"
-            )
+        if legal_result and legal_result.get("source") == "previous_result":
+            formatted_legal = legal_result["formatted"]
+        elif legal_result and legal_result["research_results"]:
+            with time_stage("format_legal"):
+                formatted_legal = await format_response(
+                    legal_result["research_results"],
+                    "legal"
+                )
         
         formatted_financial = None
-        if financial_result:
-            formatted_financial = await format_response(
-                financial_result["research_results"],
-                "finance"
-            )
+        if financial_result and financial_result.get("source") == "previous_result":
+            formatted_financial = financial_result["formatted"]
+        elif financial_result and financial_result["research_results"]:
+            with time_stage("format_financial"):
+                formatted_financial = await format_response(
+                    financial_result["research_results"],
+                    "finance"
+                )
 
-        print("formatted_legal", formatted_legal)
+        logger.debug("Formatted legal: %s", payload(formatted_legal), extra=PAYLOAD)
         if formatted_financial:
-            print("formatted_financial", formatted_financial)
+            logger.debug("Formatted financial: %s", payload(formatted_financial), extra=PAYLOAD)
         
-        # Step 5: Use Snowflake to synthesize combined response
+        # Step 5: Use Snowflake to synthesize combined response (skipped under overload)
         synthesized_plan = None
-        try:
-            synthesized_plan = await synthesize_responses(
-                legal_data=formatted_legal,
-                financial_data=formatted_financial,
-                user_message=request.message,
-                location=request.location,
-                budget=request.budget
-            )
-            print("Synthesized plan:", synthesized_plan)
-        except Exception as e:
-            print(f"Warning: Snowflake synthesis failed: {e}")
-            synthesized_plan = None
+        # Reusable only if exactly the previous agent sections feed it again
+        previous_sections = {name for name in ("legal", "financial") if (previous or {}).get(name)}
+        current_sections = {name for name, result in (("legal", legal_result), ("financial", financial_result)) if result}
+        if (
+            "synthesis" in reusable
+            and previous.get("synthesized_plan")
+            and previous_sections == current_sections
+            and all(name in reused_stages for name in current_sections)
+        ):
+            synthesized_plan = previous["synthesized_plan"]
+            reused_stages.append("synthesis")
+        elif "skip_synthesis" in degradations:
+            applied_degradations.append("skip_synthesis")
+            FALLBACKS.inc(kind="skip_synthesis")
+        else:
+            try:
+                with time_stage("synthesize_responses"):
+                    synthesized_plan = await synthesize_responses(
+                        legal_data=formatted_legal,
+                        financial_data=formatted_financial,
+                        user_message=request.message,
+                        location=request.location,
+                        budget=request.budget
+                    )
+                logger.debug("Synthesized plan: %s", payload(synthesized_plan), extra=PAYLOAD)
+            except Exception as e:
+                logger.warning("Snowflake synthesis failed: %s", e)
+                FALLBACKS.inc(kind="synthesis_failed")
+                synthesized_plan = None
         
         # Step 6: Return structured response
         response_data = {
@@ -187,12 +564,30 @@ async def submit_business_idea(request: BusinessIdeaRequest):
                 "formatted": formatted_legal,
                 "raw": legal_result["research_results"]
             }
+            if legal_result.get("partial"):
+                response_data["legal"]["partial"] = True
+                response_data["legal"]["source"] = legal_result.get("source")
         
         if financial_result:
             response_data["financial"] = {
                 "formatted": formatted_financial,
                 "raw": financial_result["research_results"]
             }
+            if financial_result.get("partial"):
+                response_data["financial"]["partial"] = True
+                response_data["financial"]["source"] = financial_result.get("source")
+        
+        if any(result and result.get("partial") for result in (legal_result, financial_result)):
+            response_data["status"] = "partial"
+
+        if skipped_agents:
+            response_data["skipped_agents"] = skipped_agents
+
+        if applied_degradations:
+            response_data["degradations"] = applied_degradations
+
+        if reused_stages:
+            response_data["reused_stages"] = reused_stages
         
         if synthesized_plan:
             response_data["synthesized_plan"] = synthesized_plan
@@ -203,6 +598,8 @@ async def submit_business_idea(request: BusinessIdeaRequest):
             data=response_data
         )
         
+    except BulkheadFull:
+        raise
     except Exception as e:
         return BusinessIdeaResponse(
             success=False,
@@ -212,7 +609,7 @@ async def submit_business_idea(request: BusinessIdeaRequest):
 
 
 @app.post("/api/business-brief")
-async def generate_business_brief(request: BusinessBriefRequest):
+async def generate_business_brief(request: BusinessBriefRequest, current_user: Optional[dict] = Depends(get_optional_user)):
     """
     Generate a business brief PDF from the current idea/session data.
     This creates a marketing-style brief (not legal/financial checklist).
@@ -229,18 +626,24 @@ async def generate_business_brief(request: BusinessBriefRequest):
             synthesized_plan=request.synthesized_plan
         )
         
-        # Step 2: Generate PDF from the structured brief data
+        # Step 2: Generate PDF from the structured brief data (ReportLab is imported on first use)
+        from pdf_generator import create_business_brief_pdf_from_structured, generate_pdf_filename
         idea_name = brief_data.get("idea_summary", request.idea[:50] if request.idea else "Business Idea")
-        pdf_buffer = create_business_brief_pdf_from_structured(brief_data)
+        with time_stage("pdf_render"):
+            pdf_buffer = create_business_brief_pdf_from_structured(brief_data)
         
         # Step 3: Generate filename
         filename = generate_pdf_filename(idea_name)
         
-        # Step 4: Store brief (for future: could store in Snowflake database here)
-        # For now, we'll just return the PDF
-        # TODO: If Snowflake database is set up, store:
-        # - brief_data as JSON in marketing_brief_text column
-        # - filename/path in marketing_brief_pdf_url column
+        # Step 4: Store brief data and filename (batched by the write-behind buffer)
+        write_behind.insert("briefs", Idea.build_brief_document(
+            current_user["id"] if current_user else None,
+            brief_data,
+            filename,
+            request.idea,
+            request.budget,
+            request.location
+        ))
         
         # Step 5: Return PDF as downloadable file
         return StreamingResponse(
@@ -251,11 +654,10 @@ async def generate_business_brief(request: BusinessBriefRequest):
             }
         )
         
+    except BulkheadFull:
+        raise
     except Exception as e:
-        print(f"Error generating business brief: {e}")
-        import traceback
-        traceback.print_exc()
-        from fastapi import HTTPException
+        logger.exception("Error generating business brief")
         raise HTTPException(
             status_code=500,
             detail=f"Error generating business brief: {str(e)}"
@@ -288,11 +690,10 @@ async def transcribe_audio_endpoint(audio: UploadFile = File(...)):
             content={"transcript": transcript}
         )
         
+    except BulkheadFull:
+        raise
     except Exception as e:
-        print(f"Error transcribing audio: {e}")
-        import traceback
-        traceback.print_exc()
-        from fastapi import HTTPException
+        logger.exception("Error transcribing audio")
         raise HTTPException(
             status_code=500,
             detail=f"Error transcribing audio: {str(e)}"
@@ -0,0 +1,177 @@
+"""
+MCP Server Selection Module
+Chooses which MCP servers a Dedalus agent run attaches, based on the parsed intent,
+the orchestration priority, and the latency/usage recorded for previous runs
+"""
+import logging
+import time
+from typing import Dict, List, Optional
+from settings import settings
+from agent_scheduler import normalize_priority
+
+logger = logging.getLogger(__name__)
+
+BRAVE_SEARCH = "windsor/brave-search-mcp"   # General web search: regulations, live cost estimates
+EXA_SEARCH = "joerup/exa-mcp"                # Semantic web research, funding resources
+GOV_INFO = "windsor/gov-info-mcp"            # U.S. government info: permits, SBA loans, grants
+
+DEFAULT_MCP_SERVERS = [BRAVE_SEARCH, EXA_SEARCH, GOV_INFO]
+
+# Servers attached per agent and orchestration priority, most useful first
+PRIORITY_SERVERS = {
+    "legal": {
+        "high": [GOV_INFO, BRAVE_SEARCH, EXA_SEARCH],
+        "medium": [GOV_INFO, BRAVE_SEARCH],
+        "low": [GOV_INFO],
+    },
+    "financial": {
+        "high": [BRAVE_SEARCH, GOV_INFO, EXA_SEARCH],
+        "medium": [BRAVE_SEARCH, GOV_INFO],
+        "low": [GOV_INFO],
+    },
+}
+
+# Tool name prefixes exposed by each server, used to attribute tool calls to servers.
+# Tool names matching no prefix are ignored (and logged at debug), never counted against a server
+SERVER_TOOL_PREFIXES = {
+    BRAVE_SEARCH: ("brave",),
+    EXA_SEARCH: ("exa", "web_search_exa", "crawling", "company_research"),
+    GOV_INFO: ("gov", "govinfo"),
+}
+
+# Samples (timed tool calls, or runs with attributed tool calls) needed before stats are trusted
+MCP_MIN_SAMPLES = settings.get_int("MCP_MIN_SAMPLES", 5)
+# Servers whose tool calls average more than this many seconds are dropped
+MCP_SLOW_SECONDS = settings.get_float("MCP_SLOW_SECONDS", 20)
+# Servers used in fewer than this fraction of runs are dropped
+MCP_MIN_USAGE_RATE = settings.get_float("MCP_MIN_USAGE_RATE", 0.2)
+# A dropped server is attached again after this long, starting over with fresh stats
+MCP_RETRY_SECONDS = settings.get_float("MCP_RETRY_SECONDS", 600)
+# Weight of the newest sample in the moving averages, so stats follow a server that changes
+MCP_STATS_DECAY = settings.get_float("MCP_STATS_DECAY", 0.2)
+
+# (agent, industry, server) -> {"runs", "calls", "avg_call_latency", "observed", "usage_rate", "last_run"}
+_server_stats: Dict[tuple, Dict] = {}
+
+
+def _normalize_industry(parsed_intent: Optional[Dict]) -> str:
+    if not parsed_intent:
+        return "unknown"
+    industry = parsed_intent.get("industry") or "unknown"
+    return str(industry).strip().lower() or "unknown"
+
+
+def _is_stale(stats: Dict) -> bool:
+    return time.monotonic() - stats["last_run"] > MCP_RETRY_SECONDS
+
+
+def _is_dropped(agent: str, industry: str, server: str) -> bool:
+    """Whether recent stats show the server is too slow or rarely used for this industry"""
+    stats = _server_stats.get((agent, industry, server))
+    if not stats or _is_stale(stats):
+        return False
+    slow = stats["calls"] >= MCP_MIN_SAMPLES and stats["avg_call_latency"] > MCP_SLOW_SECONDS
+    unused = stats["observed"] >= MCP_MIN_SAMPLES and stats["usage_rate"] < MCP_MIN_USAGE_RATE
+    return slow or unused
+
+
+def select_mcp_servers(agent: str, parsed_intent: Dict = None, priority: str = None) -> List[str]:
+    """
+    Choose the MCP servers to attach to a Dedalus agent run.
+
+    Args:
+        agent: "legal" or "financial"
+        parsed_intent: Output of parse_intent, used for the industry
+        priority: Orchestration priority for the agent (high/medium/low)
+
+    Returns:
+        list: MCP server slugs, never empty
+    """
+    candidates = PRIORITY_SERVERS.get(agent, {}).get(normalize_priority(priority), DEFAULT_MCP_SERVERS)
+    industry = _normalize_industry(parsed_intent)
+    selected = [server for server in candidates if not _is_dropped(agent, industry, server)]
+    # Always keep at least the most useful server for this priority
+    return selected or candidates[:1]
+
+
+def _server_for_tool(name: str, servers: List[str]) -> Optional[str]:
+    name = name.lower()
+    for server in servers:
+        if any(name.startswith(prefix) for prefix in SERVER_TOOL_PREFIXES.get(server, ())):
+            return server
+    return None
+
+
+def _call_seconds(record) -> Optional[float]:
+    """Duration of one tool-call record, when the run reported it"""
+    if not isinstance(record, dict):
+        return None
+    if isinstance(record.get("duration_ms"), (int, float)):
+        return record["duration_ms"] / 1000
+    if isinstance(record.get("duration"), (int, float)):
+        return float(record["duration"])
+    return None
+
+
+def _tool_calls(result) -> List[tuple]:
+    """(tool name, seconds or None) for each tool call of a run, from tool_results or tools_called"""
+    records = getattr(result, "tool_results", None)
+    if records:
+        return [(str(record.get("name", "")), _call_seconds(record)) for record in records if isinstance(record, dict)]
+    return [(str(name), None) for name in getattr(result, "tools_called", None) or ()]
+
+
+def _average(current: float, sample: float, samples: int) -> float:
+    # Plain mean until the window fills, then an exponential moving average
+    return current + (sample - current) * max(MCP_STATS_DECAY, 1 / samples)
+
+
+def record_mcp_run(agent: str, parsed_intent: Dict, servers: List[str], result=None):
+    """
+    Record latency and usage of the MCP servers attached to a finished run.
+    Latency is taken per tool call and charged to the server exposing the tool; usage is only
+    counted for runs where some tool call could be attributed to an attached server, so a run
+    without (recognized) tool calls says nothing about which servers were useful.
+    A run that timed out (result None) is not attributed to any server.
+    """
+    industry = _normalize_industry(parsed_intent)
+    now = time.monotonic()
+    calls = []
+    for name, seconds in _tool_calls(result) if result is not None else ():
+        server = _server_for_tool(name, servers)
+        if server is None:
+            logger.debug("Tool call %s matches none of the attached MCP servers", name)
+        calls.append((server, seconds))
+    used = {server for server, _ in calls if server is not None}
+    for server in servers:
+        key = (agent, industry, server)
+        stats = _server_stats.get(key)
+        if stats is None or _is_stale(stats):
+            stats = _server_stats[key] = {
+                "runs": 0, "calls": 0, "avg_call_latency": 0.0, "observed": 0, "usage_rate": 0.0, "last_run": now
+            }
+        stats["runs"] += 1
+        stats["last_run"] = now
+        for call_server, seconds in calls:
+            if call_server == server and seconds is not None:
+                stats["calls"] += 1
+                stats["avg_call_latency"] = _average(stats["avg_call_latency"], seconds, stats["calls"])
+        if used:
+            stats["observed"] += 1
+            stats["usage_rate"] = _average(stats["usage_rate"], 1.0 if server in used else 0.0, stats["observed"])
+
+
+def get_mcp_stats() -> List[Dict]:
+    """Return recorded per-server stats"""
+    return [
+        {
+            "agent": agent,
+            "industry": industry,
+            "server": server,
+            "runs": stats["runs"],
+            "usage_rate": round(stats["usage_rate"], 3) if stats["observed"] else None,
+            "avg_call_latency_seconds": round(stats["avg_call_latency"], 3) if stats["calls"] else None,
+            "dropped": _is_dropped(agent, industry, server),
+        }
+        for (agent, industry, server), stats in _server_stats.items()
+    ]
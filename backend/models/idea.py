@@ -0,0 +1,153 @@
+"""
+Idea model for submitted business ideas and their results
+Light idea documents (for listing) live in "ideas"; the heavy pipeline payload for each idea
+lives in "idea_results" under the same _id and is only loaded on demand.
+"""
+import base64
+import secrets
+from datetime import datetime
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from pymongo import DESCENDING
+
+# Fields fetched for list views; the heavy payload stays in idea_results
+LIST_PROJECTION = {"title": 1, "summary": 1, "createdAt": 1, "status": 1, "budget": 1, "location": 1}
+
+
+def _summary_from_result(result: Optional[dict]) -> str:
+    """Pick a short summary for list views from the pipeline result"""
+    if not result:
+        return ""
+    plan = result.get("synthesized_plan") or {}
+    if isinstance(plan, dict) and plan.get("executive_summary"):
+        return plan["executive_summary"]
+    for section in ("legal", "financial"):
+        formatted = (result.get(section) or {}).get("formatted") or {}
+        if isinstance(formatted, dict) and formatted.get("summary"):
+            return formatted["summary"]
+    return ""
+
+
+def encode_cursor(created_at: datetime, idea_id: ObjectId) -> str:
+    """Opaque pagination cursor pointing just past the given idea"""
+    raw = f"{created_at.isoformat()}|{idea_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Decode a cursor from encode_cursor; raises ValueError when malformed"""
+    try:
+        created_at, idea_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), ObjectId(idea_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class Idea:
+    def __init__(self, db):
+        self.collection = db.ideas
+        self.results = db.idea_results
+
+    @staticmethod
+    async def ensure_indexes(db):
+        """Create the ideas indexes; called once at startup"""
+        # Serves "newest ideas of a user" and the cursor's (createdAt, _id) tie-break
+        await db.ideas.create_index(
+            [("userId", 1), ("createdAt", DESCENDING), ("_id", DESCENDING)],
+            name="userId_createdAt"
+        )
+
+    async def list_for_user(self, user_id: str, cursor: str = None, limit: int = 20) -> Tuple[List[dict], Optional[str]]:
+        """
+        List a user's ideas newest first, with only the list-view fields.
+        Returns (ideas, next_cursor); next_cursor is None on the last page.
+        """
+        query = {"userId": user_id}
+        if cursor:
+            created_at, idea_id = decode_cursor(cursor)
+            query["$or"] = [
+                {"createdAt": {"$lt": created_at}},
+                {"createdAt": created_at, "_id": {"$lt": idea_id}},
+            ]
+
+        documents = await self.collection.find(query, LIST_PROJECTION) \
+            .sort([("createdAt", DESCENDING), ("_id", DESCENDING)]) \
+            .limit(limit + 1) \
+            .to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = encode_cursor(last["createdAt"], last["_id"])
+        return [self._to_dict(document) for document in documents], next_cursor
+
+    async def find_for_user(self, idea_id: str, user_id: str) -> Optional[dict]:
+        """Load one idea with its full pipeline result"""
+        if not ObjectId.is_valid(idea_id):
+            return None
+        idea = await self.collection.find_one({"_id": ObjectId(idea_id), "userId": user_id})
+        if not idea:
+            return None
+        result = await self.results.find_one({"_id": idea["_id"]}, {"message": 1, "result": 1})
+        idea_dict = self._to_dict(idea)
+        idea_dict["message"] = result.get("message") if result else None
+        idea_dict["result"] = result.get("result") if result else None
+        return idea_dict
+
+    def _to_dict(self, idea: dict) -> dict:
+        """Convert MongoDB document to dict"""
+        return {
+            "id": str(idea["_id"]),
+            "title": idea.get("title", ""),
+            "summary": idea.get("summary", ""),
+            "budget": idea.get("budget"),
+            "location": idea.get("location"),
+            "status": idea.get("status"),
+            "createdAt": idea.get("createdAt").isoformat() if idea.get("createdAt") else None,
+        }
+
+    @staticmethod
+    def build_documents(user_id: Optional[str], message: str, budget: str = None, location: str = None,
+                        result: dict = None, status: str = "completed") -> tuple:
+        """
+        Build the (idea, idea_result) documents for one submission.
+        The _id is generated client-side so both can be written in a later batch.
+        The result gets an unguessable accessToken, required to read it without owning it.
+        """
+        idea_id = ObjectId()
+        created_at = datetime.utcnow()
+        idea = {
+            "_id": idea_id,
+            "userId": user_id,
+            "title": " ".join(message.split())[:80],
+            "summary": _summary_from_result(result)[:500],
+            "budget": budget,
+            "location": location,
+            "status": status,
+            "createdAt": created_at,
+        }
+        idea_result = {
+            "_id": idea_id,
+            "userId": user_id,
+            "message": message,
+            "result": result,
+            "accessToken": secrets.token_urlsafe(24),
+            "createdAt": created_at,
+        }
+        return idea, idea_result
+
+    @staticmethod
+    def build_brief_document(user_id: Optional[str], brief_data: dict, pdf_filename: str,
+                             idea: str, budget: str = None, location: str = None) -> dict:
+        """Build the stored record for a generated business brief"""
+        return {
+            "_id": ObjectId(),
+            "userId": user_id,
+            "idea": idea,
+            "budget": budget,
+            "location": location,
+            "brief": brief_data,
+            "pdfFilename": pdf_filename,
+            "createdAt": datetime.utcnow(),
+        }
@@ -1,19 +1,60 @@
 """
 User model for authentication
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import DuplicateKeyError
 import bcrypt
 from bson import ObjectId
+from settings import settings
+
+# bcrypt work factor for new hashes; existing hashes with another cost are rehashed on login
+BCRYPT_ROUNDS = settings.get_int("BCRYPT_ROUNDS", 12)
+# Threads hashing/verifying passwords; bcrypt releases the GIL, so this bounds CPU used by login storms
+BCRYPT_MAX_WORKERS = settings.get_int("BCRYPT_MAX_WORKERS", 2)
+
+_password_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt")
+
+
+def _hash_password_sync(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _check_password_sync(password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+async def hash_password(password: str, rounds: int = None) -> str:
+    """Hash a password on the bcrypt executor, off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, _hash_password_sync, password, rounds or BCRYPT_ROUNDS)
+
+
+async def check_password(password: str, hashed_password: str) -> bool:
+    """Verify a password against a bcrypt hash on the bcrypt executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, _check_password_sync, password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a bcrypt hash ($2b$<cost>$...) was made with a different work factor"""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
 
 
 class User:
     def __init__(self, db):
         self.collection = db.users
-        # Create indexes
-        self.collection.create_index("email", unique=True)
+    
+    @staticmethod
+    async def ensure_indexes(db):
+        """Create the users indexes; called once at startup"""
+        await db.users.create_index("email", unique=True)
     
     async def create_user(self, full_name: str, email: str, password: str) -> dict:
         """Create a new user with hashed password"""
@@ -23,13 +64,12 @@ class User:
             raise ValueError("User with this email already exists")
         
         # Hash password
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
+        hashed_password = await hash_password(password)
         
         user_data = {
             "fullName": full_name.strip(),
             "email": email.lower().strip(),
-            "password": hashed_password.decode('utf-8'),
+            "password": hashed_password,
             "ideas": [],
             "createdAt": datetime.utcnow(),
             "lastLogin": None
@@ -63,9 +103,19 @@ class User:
             {"$set": {"lastLogin": datetime.utcnow()}}
         )
     
-    def verify_password(self, password: str, hashed_password: str) -> bool:
+    async def verify_password(self, password: str, hashed_password: str) -> bool:
         """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        return await check_password(password, hashed_password)
+    
+    async def rehash_password_if_needed(self, user_id: str, password: str, hashed_password: str):
+        """Rehash a verified password when BCRYPT_ROUNDS has changed since it was hashed"""
+        if not password_needs_rehash(hashed_password):
+            return
+        new_hash = await hash_password(password)
+        await self.collection.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$set": {"password": new_hash}}
+        )
     
     def _to_dict(self, user: dict, include_password: bool = False) -> dict:
         """Convert MongoDB document to dict, excluding sensitive fields"""
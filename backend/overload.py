@@ -0,0 +1,111 @@
+"""
+Overload Controller
+Watches agent/upstream queue depth and recent /api/submit latency percentiles and picks a
+degraded pipeline mode, so the service stays responsive when upstreams are saturated.
+
+Modes and the degradations they enable:
+    normal   - none
+    elevated - skip_synthesis, prefer_cached_research
+    high     - elevated + single_branch (only the highest-priority agent branch runs)
+    critical - reject new submissions early with 503 + Retry-After
+"""
+import math
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from settings import settings
+from bulkhead import BulkheadFull, bulkhead_stats
+from agent_scheduler import agent_scheduler
+
+
+# Seconds of /api/submit latencies kept for percentiles
+OVERLOAD_LATENCY_WINDOW_SECONDS = settings.get_float("OVERLOAD_LATENCY_WINDOW_SECONDS", 300)
+# Queue depth (waiting agent branches + queued upstream calls) thresholds
+OVERLOAD_ELEVATED_QUEUE = settings.get_int("OVERLOAD_ELEVATED_QUEUE", 4)
+OVERLOAD_HIGH_QUEUE = settings.get_int("OVERLOAD_HIGH_QUEUE", 12)
+OVERLOAD_CRITICAL_QUEUE = settings.get_int("OVERLOAD_CRITICAL_QUEUE", 32)
+# p95 /api/submit latency thresholds, in seconds
+OVERLOAD_ELEVATED_P95_SECONDS = settings.get_float("OVERLOAD_ELEVATED_P95_SECONDS", 150)
+OVERLOAD_HIGH_P95_SECONDS = settings.get_float("OVERLOAD_HIGH_P95_SECONDS", 240)
+
+MODES = ("normal", "elevated", "high", "critical")
+MODE_DEGRADATIONS = {
+    "normal": [],
+    "elevated": ["skip_synthesis", "prefer_cached_research"],
+    "high": ["skip_synthesis", "prefer_cached_research", "single_branch"],
+    "critical": ["reject"],
+}
+
+
+class Overloaded(BulkheadFull):
+    """Raised when a submission is rejected early because the service is overloaded"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("pipeline", retry_after)
+
+
+class OverloadController:
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._latencies = deque()  # (finished_at, seconds)
+        self.mode_counts = {mode: 0 for mode in MODES}
+
+    def record_latency(self, seconds: float):
+        """Record the latency of a completed submission"""
+        now = time.monotonic()
+        self._latencies.append((now, seconds))
+        self._trim(now)
+
+    def _trim(self, now: float):
+        while self._latencies and now - self._latencies[0][0] > self.window_seconds:
+            self._latencies.popleft()
+
+    def percentile(self, percent: float) -> Optional[float]:
+        self._trim(time.monotonic())
+        if not self._latencies:
+            return None
+        ordered = sorted(seconds for _, seconds in self._latencies)
+        index = min(len(ordered) - 1, max(0, math.ceil(percent / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def queue_depth(self) -> int:
+        queued_upstream = sum(stats["queued"] for stats in bulkhead_stats().values())
+        return agent_scheduler.queue_depth() + queued_upstream
+
+    def current_mode(self) -> str:
+        queue = self.queue_depth()
+        p95 = self.percentile(95) or 0.0
+        if queue >= OVERLOAD_CRITICAL_QUEUE:
+            return "critical"
+        if queue >= OVERLOAD_HIGH_QUEUE or p95 >= OVERLOAD_HIGH_P95_SECONDS:
+            return "high"
+        if queue >= OVERLOAD_ELEVATED_QUEUE or p95 >= OVERLOAD_ELEVATED_P95_SECONDS:
+            return "elevated"
+        return "normal"
+
+    def admit(self) -> List[str]:
+        """
+        Decide how the next submission runs.
+        Returns the degradations to apply, or raises Overloaded in critical mode.
+        """
+        mode = self.current_mode()
+        self.mode_counts[mode] += 1
+        if mode == "critical":
+            p50 = self.percentile(50) or 30.0
+            raise Overloaded(max(1, math.ceil(p50)))
+        return list(MODE_DEGRADATIONS[mode])
+
+    def stats(self) -> Dict:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "mode": self.current_mode(),
+            "queue_depth": self.queue_depth(),
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "samples": len(self._latencies),
+            "mode_counts": dict(self.mode_counts),
+        }
+
+
+overload_controller = OverloadController(OVERLOAD_LATENCY_WINDOW_SECONDS)
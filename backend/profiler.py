@@ -0,0 +1,138 @@
+"""
+Sampling Profiler
+In-process stack sampler for a live worker. A thread wakes every PROFILE_SAMPLE_INTERVAL_SECONDS,
+reads every thread's current frame with sys._current_frames() and counts identical stacks.
+Nothing runs between profiles, so there is no overhead while idle.
+
+Output is either collapsed stacks (flamegraph.pl / speedscope / inferno) or a speedscope JSON file.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Tuple
+from settings import settings
+
+PROFILE_SAMPLE_INTERVAL_SECONDS = settings.get_float("PROFILE_SAMPLE_INTERVAL_SECONDS", 0.005)
+PROFILE_MAX_SECONDS = settings.get_float("PROFILE_MAX_SECONDS", 60)
+# Stacks deeper than this keep their innermost frames
+PROFILE_MAX_DEPTH = 128
+
+_APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+def _short_filename(filename: str) -> str:
+    if filename.startswith(_APP_ROOT):
+        return os.path.relpath(filename, _APP_ROOT)
+    _, marker, package_path = filename.rpartition("site-packages" + os.sep)
+    if marker:
+        return package_path
+    return os.path.basename(filename)
+
+
+class Profile:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.time()
+        self.duration = 0.0
+        self.samples = 0
+        # (thread name, (frame labels, outermost first)) -> count
+        self.stacks: Counter = Counter()
+        # frame label -> (name, file, line)
+        self.frames: Dict[str, Tuple[str, str, int]] = {}
+
+    def _label(self, code) -> str:
+        filename = _short_filename(code.co_filename)
+        label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        if label not in self.frames:
+            self.frames[label] = (code.co_name, filename, code.co_firstlineno)
+        return label
+
+    def add_sample(self, thread_names: Dict[int, str], skip_thread: int):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip_thread:
+                continue
+            labels = []
+            while frame is not None and len(labels) < PROFILE_MAX_DEPTH:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.reverse()
+            self.stacks[(thread_names.get(thread_id, str(thread_id)), tuple(labels))] += 1
+        self.samples += 1
+
+    def to_collapsed(self) -> str:
+        """One "thread;outer;...;inner count" line per distinct stack"""
+        lines = [
+            f"{thread};{';'.join(labels)} {count}"
+            for (thread, labels), count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self) -> Dict:
+        """speedscope file format, one sampled profile per thread"""
+        frame_index = {label: index for index, label in enumerate(self.frames)}
+        profiles: Dict[str, Dict] = {}
+        for (thread, labels), count in self.stacks.items():
+            profile = profiles.get(thread)
+            if profile is None:
+                profile = profiles[thread] = {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(self.duration, 6),
+                    "samples": [],
+                    "weights": [],
+                }
+            profile["samples"].append([frame_index[label] for label in labels])
+            profile["weights"].append(round(count * self.interval, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {
+                "frames": [{"name": name, "file": filename, "line": line} for name, filename, line in self.frames.values()]
+            },
+            "profiles": list(profiles.values()),
+            "name": f"foundrmate worker {os.getpid()} ({self.samples} samples)",
+            "exporter": "foundrmate-profiler",
+        }
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float, max_seconds: float):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float) -> Profile:
+        """Sample all threads for the given duration; blocks the calling thread, never the event loop's"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            seconds = min(seconds, self.max_seconds)
+            profile = Profile(self.interval)
+            own_thread = threading.get_ident()
+            started = time.perf_counter()
+            deadline = started + seconds
+            next_sample = started
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if now < next_sample:
+                    time.sleep(next_sample - now)
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                profile.add_sample(thread_names, own_thread)
+                # Skip missed ticks instead of bursting to catch up
+                next_sample = max(next_sample + self.interval, time.perf_counter())
+            profile.duration = time.perf_counter() - started
+            return profile
+        finally:
+            self._lock.release()
+
+
+profiler = SamplingProfiler(interval=PROFILE_SAMPLE_INTERVAL_SECONDS, max_seconds=PROFILE_MAX_SECONDS)
@@ -0,0 +1,144 @@
+"""
+Result field selection and raw research retrieval
+/api/submit?fields=... returns only the requested parts of the result; the raw agent research
+text (the bulk of a full response) is fetched separately from
+GET /api/results/{idea_id}/raw/{legal|financial} when a client actually shows it.
+Previous results are also looked up here for incremental re-runs (see incremental.py).
+
+ObjectIds are predictable, so an id alone never grants access: every result gets a random
+result_token, returned with it, and only its owner or a holder of that token can read it again.
+
+fields is a comma-separated list of result keys, optionally one level deep, e.g.
+"legal.formatted,financial.formatted,synthesized_plan". status, idea_id and result_token are
+always returned.
+"""
+import hmac
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Dict, List, Optional
+from bson import ObjectId
+from settings import settings
+from database import get_db
+from auth import get_optional_user
+from ttl_cache import TTLCache
+
+router = APIRouter(prefix="/api/results", tags=["results"])
+
+RAW_SECTIONS = ("legal", "financial")
+# Returned whatever fields asks for: clients need them to follow up on a result
+ALWAYS_INCLUDED = ("status", "idea_id", "result_token")
+# Kept on any partially selected agent section, so a timed-out agent is still flagged
+SECTION_FLAGS = ("partial", "source")
+
+# Recent results, served before the write-behind buffer has flushed them to MongoDB
+# (and when no database is configured)
+RESULT_CACHE_SIZE = settings.get_int("RESULT_CACHE_SIZE", 512)
+RESULT_CACHE_TTL_SECONDS = settings.get_float("RESULT_CACHE_TTL_SECONDS", 600)
+_recent_results = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL_SECONDS)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[List[str]]]:
+    """Split a fields parameter into key paths; None (or empty) means the full result"""
+    if not fields:
+        return None
+    paths = []
+    for field in fields.split(","):
+        path = [part for part in field.strip().split(".") if part]
+        if not path:
+            continue
+        if len(path) > 2:
+            raise ValueError(f"Field {field.strip()!r} is nested too deeply (at most section.key)")
+        paths.append(path)
+    return paths or None
+
+
+def raw_url(idea_id: str, section: str, token: str) -> str:
+    return f"{router.prefix}/{idea_id}/raw/{section}?token={token}"
+
+
+def select_fields(data: Dict, paths: Optional[List[List[str]]]) -> Dict:
+    """
+    Keep only the requested parts of a pipeline result.
+    Agent sections whose raw text is left out get a raw_url to fetch it from instead.
+    """
+    if paths is None:
+        return data
+    selected = {key: data[key] for key in ALWAYS_INCLUDED if key in data}
+    for path in paths:
+        key = path[0]
+        if key not in data:
+            continue
+        if len(path) == 1:
+            selected[key] = data[key]
+            continue
+        value = data[key]
+        if selected.get(key) is value or not isinstance(value, dict) or path[1] not in value:
+            continue
+        selected.setdefault(key, {})[path[1]] = value[path[1]]
+
+    idea_id, token = data.get("idea_id"), data.get("result_token")
+    for name in RAW_SECTIONS:
+        section = selected.get(name)
+        if not isinstance(section, dict) or section is data[name]:
+            continue
+        section.update({flag: data[name][flag] for flag in SECTION_FLAGS if flag in data[name]})
+        if idea_id and token and "raw" not in section and "raw" in data[name]:
+            section["raw_url"] = raw_url(idea_id, name, token)
+    return selected
+
+
+def remember_result(idea_id: str, user_id: Optional[str], access_token: str, data: Dict):
+    """Keep a fresh result for raw text lookups and incremental re-runs"""
+    _recent_results.set(idea_id, (user_id, access_token, data))
+
+
+def _can_access(owner_id: Optional[str], access_token: Optional[str],
+                current_user: Optional[dict], token: Optional[str]) -> bool:
+    # The owner needs no token; anyone else (including for anonymous results) needs the result's token
+    if owner_id and current_user is not None and current_user["id"] == owner_id:
+        return True
+    return bool(token and access_token and hmac.compare_digest(token, access_token))
+
+
+async def _load(idea_id: str, projection: Dict) -> Optional[Dict]:
+    db = get_db()
+    if db is None or not ObjectId.is_valid(idea_id):
+        return None
+    return await db.idea_results.find_one({"_id": ObjectId(idea_id)}, {"userId": 1, "accessToken": 1, **projection})
+
+
+async def load_result(idea_id: str, token: Optional[str], current_user: Optional[dict]) -> Optional[Dict]:
+    """A previous pipeline result the current user (or token holder) may see, or None"""
+    entry = _recent_results.get(idea_id)
+    if entry is None:
+        document = await _load(idea_id, {"result": 1})
+        if not document or not document.get("result"):
+            return None
+        entry = (document.get("userId"), document.get("accessToken"), document["result"])
+    return entry[2] if _can_access(entry[0], entry[1], current_user, token) else None
+
+
+async def _load_raw(idea_id: str, section: str) -> Optional[tuple]:
+    """(user_id, access token, raw text) from the recent or stored result, or None"""
+    entry = _recent_results.get(idea_id)
+    if entry is not None:
+        user_id, access_token, data = entry
+    else:
+        document = await _load(idea_id, {f"result.{section}.raw": 1})
+        if not document:
+            return None
+        user_id, access_token, data = document.get("userId"), document.get("accessToken"), document.get("result") or {}
+    raw = (data.get(section) or {}).get("raw")
+    return None if raw is None else (user_id, access_token, raw)
+
+
+@router.get("/{idea_id}/raw/{section}")
+async def get_raw_research(idea_id: str, section: str, token: Optional[str] = None,
+                           current_user: Optional[dict] = Depends(get_optional_user)):
+    """Raw research text of one agent section of a result; token is the result's result_token"""
+    if section not in RAW_SECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown section, expected one of: {', '.join(RAW_SECTIONS)}")
+    entry = await _load_raw(idea_id, section)
+    # Same 404 for a wrong token as for a missing result, so ids cannot be probed
+    if entry is None or not _can_access(entry[0], entry[1], current_user, token):
+        raise HTTPException(status_code=404, detail="Result not found")
+    return {"success": True, "idea_id": idea_id, "section": section, "raw": entry[2]}
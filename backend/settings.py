@@ -0,0 +1,35 @@
+"""
+Application Settings
+Loads .env once, on first import, and gives every module typed access to configuration.
+Modules import this instead of calling load_dotenv() themselves.
+
+Values are read from the process environment at access time, so variables set after startup
+(e.g. by benchmarks before they import the app) are still honoured.
+"""
+import os
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Settings:
+    def get_str(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return os.environ.get(name, default)
+
+    def get_int(self, name: str, default: int) -> int:
+        value = os.environ.get(name)
+        return int(value) if value not in (None, "") else default
+
+    def get_float(self, name: str, default: float) -> float:
+        value = os.environ.get(name)
+        return float(value) if value not in (None, "") else default
+
+    def get_bool(self, name: str, default: bool = False) -> bool:
+        value = os.environ.get(name)
+        if value in (None, ""):
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+settings = Settings()
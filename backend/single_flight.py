@@ -0,0 +1,73 @@
+"""
+Single-Flight Request Coalescing
+Concurrent calls with the same key share one in-flight execution and all receive its result
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+# Every SingleFlight created, for stats reporting
+_registry: List["SingleFlight"] = []
+
+
+def make_key(*parts: Any) -> str:
+    """Build a coalescing key from parts, normalizing case and whitespace of strings"""
+    normalized = [" ".join(part.lower().split()) if isinstance(part, str) else part for part in parts]
+    encoded = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+        _registry.append(self)
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs), or attach to an identical call already in flight.
+        The shared execution is only cancelled once every caller waiting on it is cancelled.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func(*args, **kwargs)))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
+
+
+def single_flight_stats() -> Dict[str, Dict]:
+    """Return stats for every SingleFlight group"""
+    return {flight.name: flight.stats() for flight in _registry}
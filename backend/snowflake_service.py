@@ -3,22 +3,29 @@ Snowflake AI (Cortex) REST API Service
 Handles intent parsing, orchestration, and response formatting plus synthesizing using Snowflake's LLM API
 """
 
-import os
+import asyncio
 import json
+import logging
 import httpx
-from typing import Dict, Literal
-from dotenv import load_dotenv
+from typing import Dict, List, Literal, Optional, Tuple
+from settings import settings
+from single_flight import SingleFlight, make_key
+from bulkhead import get_bulkhead
+from metrics import time_stage, FALLBACKS
+from tracing import span
+from logging_config import payload as log_payload, PAYLOAD
+from cassettes import through_cassette, cassette_key
 
-# Load environment variables
-load_dotenv()
+
+logger = logging.getLogger(__name__)
 
 # CONFIGURATION 
-SNOWFLAKE_ACCOUNT = os.getenv("SNOWFLAKE_ACCOUNT")
-SNOWFLAKE_USER = os.getenv("SNOWFLAKE_USER")
-SNOWFLAKE_ROLE = os.getenv("SNOWFLAKE_ROLE")
-SNOWFLAKE_PAT = os.getenv("SNOWFLAKE_PAT")
-SNOWFLAKE_MODEL = os.getenv("SNOWFLAKE_MODEL")
-SNOWFLAKE_HOST = os.getenv("SNOWFLAKE_HOST")
+SNOWFLAKE_ACCOUNT = settings.get_str("SNOWFLAKE_ACCOUNT")
+SNOWFLAKE_USER = settings.get_str("SNOWFLAKE_USER")
+SNOWFLAKE_ROLE = settings.get_str("SNOWFLAKE_ROLE")
+SNOWFLAKE_PAT = settings.get_str("SNOWFLAKE_PAT")
+SNOWFLAKE_MODEL = settings.get_str("SNOWFLAKE_MODEL")
+SNOWFLAKE_HOST = settings.get_str("SNOWFLAKE_HOST")
 
 
 
@@ -51,6 +58,124 @@ def _build_headers() -> dict:
     }
 
 
+def _parse_llm_json(content: str):
+    """Parse the JSON object in a completion, dropping newlines, ``` fences and the fence's json tag"""
+    cleaned_content = content.strip().replace("\n", "").replace("```", "").replace("json", "", 1).strip()
+    return json.loads(cleaned_content)
+
+
+# Identical Cortex requests in flight at the same time share one HTTP call
+_cortex_flight = SingleFlight("cortex")
+
+
+def _encode_cortex_response(resp: httpx.Response) -> dict:
+    return {
+        "status_code": resp.status_code,
+        "content_type": resp.headers.get("content-type", "application/json"),
+        "text": resp.text,
+    }
+
+
+def _decode_cortex_response(data: dict) -> httpx.Response:
+    return httpx.Response(
+        data["status_code"],
+        headers={"content-type": data["content_type"]},
+        text=data["text"],
+        request=httpx.Request("POST", CORTEX_ENDPOINT or "http://cassette"),
+    )
+
+
+# One pooled client for all Cortex calls, so requests reuse warm TLS connections
+CORTEX_MAX_CONNECTIONS = settings.get_int("CORTEX_MAX_CONNECTIONS", 32)
+CORTEX_KEEPALIVE_SECONDS = settings.get_float("CORTEX_KEEPALIVE_SECONDS", 60)
+
+_cortex_client = None
+
+
+def get_cortex_client() -> httpx.AsyncClient:
+    global _cortex_client
+    if _cortex_client is None or _cortex_client.is_closed:
+        _cortex_client = httpx.AsyncClient(
+            timeout=60,
+            limits=httpx.Limits(
+                max_connections=CORTEX_MAX_CONNECTIONS,
+                max_keepalive_connections=CORTEX_MAX_CONNECTIONS,
+                keepalive_expiry=CORTEX_KEEPALIVE_SECONDS,
+            ),
+        )
+    return _cortex_client
+
+
+async def close_cortex_client():
+    global _cortex_client
+    if _cortex_client is not None:
+        await _cortex_client.aclose()
+        _cortex_client = None
+
+
+async def warm_cortex(ping: bool = False) -> Dict:
+    """
+    Open a pooled connection to SNOWFLAKE_HOST (DNS + TLS) ahead of the first request.
+    With ping, also run a one-token completion to check the PAT and model end to end.
+    """
+    if not BASE_ENDPOINT:
+        raise ValueError("SNOWFLAKE_HOST must be set to warm the Cortex connection")
+    client = get_cortex_client()
+    # Any HTTP status means the connection is established; only the handshake matters here
+    resp = await client.get(BASE_ENDPOINT, timeout=15)
+    result = {"connected": True, "status_code": resp.status_code}
+    if ping:
+        ping_resp, _ = await _post_cortex({
+            "model": SNOWFLAKE_MODEL,
+            "messages": [{"role": "user", "content": "ping"}],
+            "max_tokens": 1,
+            "stream": False,
+        }, _build_headers(), timeout=30)
+        ping_resp.raise_for_status()
+        result["ping_status_code"] = ping_resp.status_code
+    return result
+
+
+async def _http_post_cortex(payload: dict, headers: dict, timeout: float) -> httpx.Response:
+    return await get_cortex_client().post(CORTEX_ENDPOINT, json=payload, headers=headers, timeout=timeout)
+
+
+async def _send_cortex_request(payload: dict, headers: dict, timeout: float, attempt: int) -> Tuple[httpx.Response, Optional[Dict]]:
+    with span("cortex.complete", model=payload.get("model"), attempt=attempt) as cortex_span:
+        async with get_bulkhead("cortex").acquire():
+            # Recorded by model and messages only, so cassettes replay against any account/host
+            resp = await through_cassette(
+                "cortex",
+                cassette_key("cortex", payload.get("model"), payload.get("messages")),
+                lambda: _http_post_cortex(payload, headers, timeout),
+                _encode_cortex_response,
+                _decode_cortex_response,
+                request_summary={"model": payload.get("model"), "attempt": attempt},
+            )
+        cortex_span.set(http_status=resp.status_code)
+        # Parsed once here and shared with the caller (and any coalesced callers)
+        result = resp.json() if resp.is_success else None
+        if not resp.is_success:
+            cortex_span.status = "error"
+        elif cortex_span.recording:
+            usage = (result or {}).get("usage") or {}
+            cortex_span.set(
+                prompt_tokens=usage.get("prompt_tokens"),
+                completion_tokens=usage.get("completion_tokens"),
+                total_tokens=usage.get("total_tokens")
+            )
+        return resp, result
+
+
+async def _post_cortex(payload: dict, headers: dict, timeout: float = 60, attempt: int = 1) -> Tuple[httpx.Response, Optional[Dict]]:
+    """
+    POST a completion request to Cortex, coalescing identical concurrent requests.
+    Returns the response and its parsed JSON body (None unless the request succeeded).
+    attempt numbers retries (e.g. the model fallback) for tracing.
+    """
+    return await _cortex_flight.do(make_key(CORTEX_ENDPOINT, payload), _send_cortex_request, dict(payload), headers, timeout, attempt)
+
+
 
     """Extract structured info (business type, industry, etc.) from user text using Snowflake LLM."""
 async def parse_intent(user_text: str) -> Dict:
@@ -87,25 +212,14 @@ Return only the JSON object, no extra text."""
 
     headers = _build_headers()
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(CORTEX_ENDPOINT, json=payload, headers=headers)
-        resp.raise_for_status()
-        result = resp.json()
+    resp, result = await _post_cortex(payload, headers, timeout=60)
+    resp.raise_for_status()
 
     try:
         
         content = result["choices"][0]["message"]["content"]
-        print(type(content)) #this is string
-        print(content)
-
-        # cleaned_content = content.strip().replace("\n", "").replace("```", "")
-        # print(type(cleaned_content))
-        # print(cleaned_content)
-        # return json.loads(cleaned_content)
-        # print(content.research_results)
-        cleaned_content = content.strip().replace("\n", "").replace("", "").replace("```", "").replace("json", "", 1).strip() #cleanup the string, only have json stuff in
-        print("cleaned_content", cleaned_content)
-        return json.loads(cleaned_content)# converting string to dict 
+        logger.debug("Cortex content: %s", log_payload(content), extra=PAYLOAD)
+        return _parse_llm_json(content)
     except Exception as e:
         raise Exception(f"Unexpected response format from Snowflake API: {result}") from e
 
@@ -168,19 +282,134 @@ Return only the JSON object."""
 
     headers = _build_headers()
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(CORTEX_ENDPOINT, json=payload, headers=headers)
-        resp.raise_for_status()
-        result = resp.json()
+    resp, result = await _post_cortex(payload, headers, timeout=60)
+    resp.raise_for_status()
 
     try:
         content = result["choices"][0]["message"]["content"]
-        cleaned_content = content.strip().replace("\n", "").replace("", "").replace("```", "").replace("json", "", 1).strip()
-        return json.loads(cleaned_content)
+        return _parse_llm_json(content)
     except Exception as e:
         raise Exception(f"Unexpected response format from Snowflake orchestration API: {result}") from e
 
 
+# BATCHED INTENT PARSING AND ORCHESTRATION (for /api/submit/batch)
+# Ideas per multi-item Cortex call; larger batches risk truncated or misnumbered output
+BATCH_LLM_ITEMS = settings.get_int("BATCH_LLM_ITEMS", 10)
+
+
+async def _complete_batch(system_prompt: str, user_prompt: str, count: int) -> List[Dict]:
+    """One Cortex call answering several items; returns exactly count objects or raises"""
+    payload = {
+        "model": SNOWFLAKE_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        "stream": False,
+    }
+    resp, result = await _post_cortex(payload, _build_headers(), timeout=120)
+    resp.raise_for_status()
+    items = _parse_llm_json(result["choices"][0]["message"]["content"])
+    if not isinstance(items, list) or len(items) != count or not all(isinstance(item, dict) for item in items):
+        raise ValueError(f"Expected a JSON array of {count} objects from the batched call")
+    return items
+
+
+async def _in_batches(items: list, complete_chunk, complete_one) -> List[Dict]:
+    """
+    Answer items in chunks of BATCH_LLM_ITEMS, one Cortex call per chunk (chunks run concurrently).
+    A chunk whose batched answer is unusable falls back to one call per item; an item that
+    fails on its own is returned as its exception, so one bad idea does not fail the batch.
+    """
+    async def run_chunk(chunk):
+        try:
+            with time_stage("batch_llm_call"):
+                return await complete_chunk(chunk)
+        except Exception as e:
+            logger.warning("Batched Cortex call for %d items failed, answering them one by one: %s", len(chunk), e)
+            FALLBACKS.inc(kind="batch_llm_unbatched")
+            return await asyncio.gather(*(complete_one(item) for item in chunk), return_exceptions=True)
+
+    chunks = [items[i:i + BATCH_LLM_ITEMS] for i in range(0, len(items), BATCH_LLM_ITEMS)]
+    results = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    return [item for chunk_result in results for item in chunk_result]
+
+
+async def parse_intents(user_texts: List[str]) -> List[Dict]:
+    """parse_intent for many ideas, several per Cortex call; results (or exceptions) are in input order"""
+    if not SNOWFLAKE_PAT or not SNOWFLAKE_HOST:
+        raise ValueError("SNOWFLAKE_PAT and SNOWFLAKE_HOST must be set in environment variables")
+
+    system_prompt = """You are a batch business intent parser. Extract structured information from each of several numbered business ideas.
+Return ONLY a valid JSON array with one object per idea, in the same order, each with this structure:
+{
+  "business_type": "string",
+  "industry": "string",
+  "location": "string",
+  "needs": { "legal": true/false, "finance": true/false }
+}"""
+
+    async def complete_chunk(chunk):
+        numbered = "\n".join(f"{i}. {' '.join(text.split())}" for i, text in enumerate(chunk, 1))
+        user_prompt = f"""Parse the following {len(chunk)} business ideas and extract structured information:
+{numbered}
+
+Return only the JSON array with exactly {len(chunk)} objects, no extra text."""
+        return await _complete_batch(system_prompt, user_prompt, len(chunk))
+
+    return await _in_batches(user_texts, complete_chunk, parse_intent)
+
+
+async def orchestrate_agents_batch(items: List[Dict]) -> List[Dict]:
+    """
+    orchestrate_agents for many ideas, several per Cortex call; results (or exceptions) are in input order.
+    Each item has message, budget, location and parsed_intent.
+    """
+    if not SNOWFLAKE_PAT or not SNOWFLAKE_HOST:
+        raise ValueError("SNOWFLAKE_PAT and SNOWFLAKE_HOST must be set in environment variables")
+
+    system_prompt = """You are a batch agent orchestration system. For each of several numbered business ideas, analyze the idea and its context to determine which agents should be called and with what priority.
+Return ONLY a valid JSON array with one object per idea, in the same order, each with this structure:
+{
+  "should_call_legal": true/false,
+  "should_call_financial": true/false,
+  "legal_priority": "high/medium/low",
+  "financial_priority": "high/medium/low",
+  "reasoning": "brief explanation of routing decisions",
+  "enhanced_prompts": {
+    "legal": "suggested enhancements to legal agent prompt",
+    "financial": "suggested enhancements to financial agent prompt"
+  }
+}"""
+
+    def describe(i: int, item: Dict) -> str:
+        context = ", ".join(
+            f"{label}: {item[key]}" for label, key in (("Location", "location"), ("Budget", "budget")) if item.get(key)
+        ) or "No additional context"
+        intent = item.get("parsed_intent") or {}
+        return (f"{i}. Business Idea: {' '.join(item['message'].split())}\n   Context: {context}\n"
+                f"   Parsed Intent: Business type: {intent.get('business_type', 'unknown')}, "
+                f"Industry: {intent.get('industry', 'unknown')}, Needs: {intent.get('needs', {})}")
+
+    async def complete_chunk(chunk):
+        numbered = "\n".join(describe(i, item) for i, item in enumerate(chunk, 1))
+        user_prompt = f"""Analyze these {len(chunk)} business ideas and determine agent routing for each:
+{numbered}
+
+Consider:
+- Legal agent should be called if business needs licenses, permits, or regulatory compliance
+- Financial agent should be called if budget is provided OR if financial planning is needed
+- Priority indicates urgency/importance of each agent's research
+
+Return only the JSON array with exactly {len(chunk)} objects."""
+        return await _complete_batch(system_prompt, user_prompt, len(chunk))
+
+    async def complete_one(item):
+        return await orchestrate_agents(item["message"], item.get("budget"), item.get("location"), item.get("parsed_intent"))
+
+    return await _in_batches(items, complete_chunk, complete_one)
+
+
 # synthesizing responses from different agents into a single business plan
 async def synthesize_responses(legal_data: Dict = None, financial_data: Dict = None, user_message: str = None, location: str = None, budget: str = None) -> Dict:
     """
@@ -243,26 +472,20 @@ Return only the JSON object."""
 
     headers = _build_headers()
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(CORTEX_ENDPOINT, json=payload, headers=headers)
-        resp.raise_for_status()
-        result = resp.json()
+    resp, result = await _post_cortex(payload, headers, timeout=60)
+    resp.raise_for_status()
 
     try:
         content = result["choices"][0]["message"]["content"]
-        cleaned_content = content.strip().replace("\n", "").replace("", "").replace("```", "").replace("json", "", 1).strip()
-        return json.loads(cleaned_content)
+        return _parse_llm_json(content)
     except Exception as e:
         raise Exception(f"Unexpected response format from Snowflake synthesis API: {result}") from e
 
 
 # --- CORE FUNCTION: FORMAT RESPONSE ---
 async def format_response(raw_text: str, response_type: Literal["legal", "finance"]) -> Dict:
-
-    print("raw_text", raw_text)
-    print(type(raw_text))
-    print("response_type", response_type)
     """Format legal or financial text into structured JSON via Snowflake LLM."""
+    logger.debug("Formatting %s response: %s", response_type, log_payload(raw_text), extra=PAYLOAD)
     if not SNOWFLAKE_PAT or not SNOWFLAKE_HOST:
         raise ValueError("SNOWFLAKE_PAT and SNOWFLAKE_HOST must be set in environment variables")
     if not CORTEX_ENDPOINT:
@@ -321,27 +544,13 @@ Return only the JSON object."""
 
     headers = _build_headers()
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(CORTEX_ENDPOINT, json=payload, headers=headers)
-        resp.raise_for_status()
-        result = resp.json() #type is dict
-
-    print("result", result)
-    print(type(result))
+    resp, result = await _post_cortex(payload, headers, timeout=60)
+    resp.raise_for_status()
 
     try:
         content = result["choices"][0]["message"]["content"]
-
-        print("content", content)
-        print(type(content)) #string
-
-        cleaned_content = content.strip().replace("\n", "").replace("", "").replace("```", "").replace("json", "", 1).strip()
-        print("cleaned_content", cleaned_content)
-        print(type(cleaned_content))
-        json_content = json.loads(cleaned_content)
-        print("json_content", json_content)
-        print(type(json_content))
-        return json_content
+        logger.debug("Formatted %s content: %s", response_type, log_payload(content), extra=PAYLOAD)
+        return _parse_llm_json(content)
     except Exception as e:
         raise Exception(f"Unexpected response format from Snowflake API: {result}") from e
 
@@ -349,7 +558,7 @@ Return only the JSON object."""
 # Model for business brief generation
 # Defaults to claude-4-sonnet, but falls back to SNOWFLAKE_MODEL if claude-4-sonnet is unavailable
 # To use claude-4-sonnet, I have SET ENABLE_CROSS_REGION_INFERENCE to all regions
-BRIEF_MODEL = os.getenv("BRIEF_MODEL")
+BRIEF_MODEL = settings.get_str("BRIEF_MODEL")
 if not BRIEF_MODEL:
     # Try claude-4-sonnet first, but fall back to SNOWFLAKE_MODEL if unavailable
     BRIEF_MODEL = "claude-4-sonnet"
@@ -400,33 +609,30 @@ Generate the professional business idea summary."""
 
     headers = _build_headers()
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(CORTEX_ENDPOINT, json=payload, headers=headers)
-        if not resp.is_success:
-            error_text = resp.text
-            # Check if it's a region availability error and fall back to SNOWFLAKE_MODEL
-            if "unavailable in your region" in error_text or "cross region inference" in error_text.lower():
-                print(f"Model {BRIEF_MODEL} unavailable in region. Falling back to SNOWFLAKE_MODEL: {SNOWFLAKE_MODEL}")
-                if SNOWFLAKE_MODEL and SNOWFLAKE_MODEL != BRIEF_MODEL:
-                    # Retry with SNOWFLAKE_MODEL
-                    payload["model"] = SNOWFLAKE_MODEL
-                    resp = await client.post(CORTEX_ENDPOINT, json=payload, headers=headers)
-                    if resp.is_success:
-                        resp.raise_for_status()
-                        result = resp.json()
-                    else:
-                        error_text = resp.text
-                        print(f"Snowflake API Error Response (fallback): {error_text}")
-                        raise Exception(f"Snowflake API error ({resp.status_code}): {error_text}")
+    resp, result = await _post_cortex(payload, headers, timeout=60)
+    if not resp.is_success:
+        error_text = resp.text
+        # Check if it's a region availability error and fall back to SNOWFLAKE_MODEL
+        if "unavailable in your region" in error_text or "cross region inference" in error_text.lower():
+            logger.warning("Model %s unavailable in region, falling back to %s", BRIEF_MODEL, SNOWFLAKE_MODEL)
+            FALLBACKS.inc(kind="brief_model_fallback")
+            if SNOWFLAKE_MODEL and SNOWFLAKE_MODEL != BRIEF_MODEL:
+                # Retry with SNOWFLAKE_MODEL
+                payload["model"] = SNOWFLAKE_MODEL
+                resp, result = await _post_cortex(payload, headers, timeout=60, attempt=2)
+                if resp.is_success:
+                    resp.raise_for_status()
                 else:
-                    raise Exception(f"Model {BRIEF_MODEL} unavailable in your region. Please enable cross-region inference or set BRIEF_MODEL to a model available in your region. Error: {error_text}")
+                    error_text = resp.text
+                    logger.error("Snowflake API error (fallback, %s): %s", resp.status_code, log_payload(error_text))
+                    raise Exception(f"Snowflake API error ({resp.status_code}): {error_text}")
             else:
-                print(f"Snowflake API Error Response: {error_text}")
-                print(f"Request payload model: {BRIEF_MODEL}")
-                raise Exception(f"Snowflake API error ({resp.status_code}): {error_text}")
+                raise Exception(f"Model {BRIEF_MODEL} unavailable in your region. Please enable cross-region inference or set BRIEF_MODEL to a model available in your region. Error: {error_text}")
         else:
-            resp.raise_for_status()
-            result = resp.json()
+            logger.error("Snowflake API error (%s, model %s): %s", resp.status_code, BRIEF_MODEL, log_payload(error_text))
+            raise Exception(f"Snowflake API error ({resp.status_code}): {error_text}")
+    else:
+        resp.raise_for_status()
 
     try:
         content = result["choices"][0]["message"]["content"]
@@ -464,33 +670,30 @@ async def generate_section_with_snowflake(
 
     headers = _build_headers()
 
-    async with httpx.AsyncClient(timeout=90) as client:
-        resp = await client.post(CORTEX_ENDPOINT, json=payload, headers=headers)
-        if not resp.is_success:
-            error_text = resp.text
-            # Check if it's a region availability error and fall back to SNOWFLAKE_MODEL
-            if "unavailable in your region" in error_text or "cross region inference" in error_text.lower():
-                print(f"Model {BRIEF_MODEL} unavailable in region for {section_name}. Falling back to SNOWFLAKE_MODEL: {SNOWFLAKE_MODEL}")
-                if SNOWFLAKE_MODEL and SNOWFLAKE_MODEL != BRIEF_MODEL:
-                    # Retry with SNOWFLAKE_MODEL
-                    payload["model"] = SNOWFLAKE_MODEL
-                    resp = await client.post(CORTEX_ENDPOINT, json=payload, headers=headers)
-                    if resp.is_success:
-                        resp.raise_for_status()
-                        result = resp.json()
-                    else:
-                        error_text = resp.text
-                        print(f"Snowflake API Error Response for {section_name} (fallback): {error_text}")
-                        raise Exception(f"Snowflake API error ({resp.status_code}): {error_text}")
+    resp, result = await _post_cortex(payload, headers, timeout=90)
+    if not resp.is_success:
+        error_text = resp.text
+        # Check if it's a region availability error and fall back to SNOWFLAKE_MODEL
+        if "unavailable in your region" in error_text or "cross region inference" in error_text.lower():
+            logger.warning("Model %s unavailable in region for %s, falling back to %s", BRIEF_MODEL, section_name, SNOWFLAKE_MODEL)
+            FALLBACKS.inc(kind="brief_model_fallback")
+            if SNOWFLAKE_MODEL and SNOWFLAKE_MODEL != BRIEF_MODEL:
+                # Retry with SNOWFLAKE_MODEL
+                payload["model"] = SNOWFLAKE_MODEL
+                resp, result = await _post_cortex(payload, headers, timeout=90, attempt=2)
+                if resp.is_success:
+                    resp.raise_for_status()
                 else:
-                    raise Exception(f"Model {BRIEF_MODEL} unavailable in your region. Please enable cross-region inference or set BRIEF_MODEL to a model available in your region. Error: {error_text}")
+                    error_text = resp.text
+                    logger.error("Snowflake API error for %s (fallback, %s): %s", section_name, resp.status_code, log_payload(error_text))
+                    raise Exception(f"Snowflake API error ({resp.status_code}): {error_text}")
             else:
-                print(f"Snowflake API Error Response for {section_name}: {error_text}")
-                print(f"Request payload model: {BRIEF_MODEL}")
-                raise Exception(f"Snowflake API error ({resp.status_code}): {error_text}")
+                raise Exception(f"Model {BRIEF_MODEL} unavailable in your region. Please enable cross-region inference or set BRIEF_MODEL to a model available in your region. Error: {error_text}")
         else:
-            resp.raise_for_status()
-            result = resp.json()
+            logger.error("Snowflake API error for %s (%s, model %s): %s", section_name, resp.status_code, BRIEF_MODEL, log_payload(error_text))
+            raise Exception(f"Snowflake API error ({resp.status_code}): {error_text}")
+    else:
+        resp.raise_for_status()
 
     try:
         content = result["choices"][0]["message"]["content"]
@@ -512,7 +715,8 @@ async def generate_complete_business_brief(
     Returns a dictionary with idea_summary and all section contents.
     """
 
-    idea_summary = await generate_idea_summary_with_snowflake(idea, budget, location)
+    with time_stage("brief_idea_summary"):
+        idea_summary = await generate_idea_summary_with_snowflake(idea, budget, location)
     
     # Building the context string
     context_parts = []
@@ -541,13 +745,14 @@ async def generate_complete_business_brief(
 Write in a professional, persuasive tone suitable for investors or business partners. 
 Return ONLY the Executive Summary text, no section headers or labels."""
     
-    executive_summary = await generate_section_with_snowflake(
-        "Executive Summary",
-        exec_summary_prompt,
-        idea_summary,
-        context_str,
-        additional_context
-    )
+    with time_stage("brief_executive_summary"):
+        executive_summary = await generate_section_with_snowflake(
+            "Executive Summary",
+            exec_summary_prompt,
+            idea_summary,
+            context_str,
+            additional_context
+        )
     
     # Step 3: Generate Market Opportunity
     market_prompt = """Write a compelling "Idea & Market Opportunity" section (2-3 paragraphs) that:
@@ -559,12 +764,13 @@ Return ONLY the Executive Summary text, no section headers or labels."""
 Write in a professional, data-driven tone. Be specific about market opportunities.
 Return ONLY the section content, no section headers or labels."""
     
-    market_opportunity = await generate_section_with_snowflake(
-        "Market Opportunity",
-        market_prompt,
-        idea_summary,
-        context_str
-    )
+    with time_stage("brief_market_opportunity"):
+        market_opportunity = await generate_section_with_snowflake(
+            "Market Opportunity",
+            market_prompt,
+            idea_summary,
+            context_str
+        )
     
     # Step 4: Generate Target Audience
     audience_prompt = """Write a detailed "Target Audience" section (2-3 paragraphs) that:
@@ -576,12 +782,13 @@ Return ONLY the section content, no section headers or labels."""
 Be specific and detailed. Write in a professional tone.
 Return ONLY the section content, no section headers or labels."""
     
-    target_audience = await generate_section_with_snowflake(
-        "Target Audience",
-        audience_prompt,
-        idea_summary,
-        context_str
-    )
+    with time_stage("brief_target_audience"):
+        target_audience = await generate_section_with_snowflake(
+            "Target Audience",
+            audience_prompt,
+            idea_summary,
+            context_str
+        )
     
     # Step 5: Generate Plan of Action
     action_plan_context = ""
@@ -606,13 +813,14 @@ Return ONLY the section content, no section headers or labels."""
 Write in a professional, strategic tone. Keep it high-level and focused on business strategy.
 Return ONLY the section content, no section headers or labels."""
     
-    plan_of_action = await generate_section_with_snowflake(
-        "Plan of Action",
-        plan_prompt,
-        idea_summary,
-        context_str,
-        action_plan_context
-    )
+    with time_stage("brief_plan_of_action"):
+        plan_of_action = await generate_section_with_snowflake(
+            "Plan of Action",
+            plan_prompt,
+            idea_summary,
+            context_str,
+            action_plan_context
+        )
     
     # Step 6: Generate Why Succeed
     why_succeed_context = ""
@@ -631,13 +839,14 @@ Return ONLY the section content, no section headers or labels."""
 Write in a confident, persuasive tone suitable for investors.
 Return ONLY the section content, no section headers or labels."""
     
-    why_succeed = await generate_section_with_snowflake(
-        "Why Succeed",
-        why_succeed_prompt,
-        idea_summary,
-        context_str,
-        why_succeed_context
-    )
+    with time_stage("brief_why_succeed"):
+        why_succeed = await generate_section_with_snowflake(
+            "Why Succeed",
+            why_succeed_prompt,
+            idea_summary,
+            context_str,
+            why_succeed_context
+        )
     
     return {
         "idea_summary": idea_summary,
@@ -0,0 +1,97 @@
+"""
+Disconnect Cancellation Test
+A client that drops mid-request must cancel the running agent calls (see run_until_disconnected).
+The app is driven directly over ASGI with a receive channel that reports http.disconnect, so any
+middleware that hides the disconnect from the endpoint (as BaseHTTPMiddleware does) fails here.
+
+Run from the backend directory:
+    python -m pytest -q tests
+"""
+import asyncio
+import json
+import time
+import httpx
+
+from benchmarks.mock_upstreams import CortexStub, FakeDedalusRunner, install_fakes
+
+CORTEX_URL = "http://cortex.mock"
+AGENT_SECONDS = 5
+DISCONNECT_AFTER_SECONDS = 0.5
+
+
+def test_client_disconnect_cancels_agent_runs(monkeypatch):
+    import main
+    import snowflake_service
+
+    install_fakes(CORTEX_URL)
+    monkeypatch.setattr(FakeDedalusRunner, "latency", staticmethod(lambda: AGENT_SECONDS))
+    started_runs, cancelled_runs = [], []
+    original_run = FakeDedalusRunner.run
+
+    async def run(self, *args, **kwargs):
+        started_runs.append(True)
+        try:
+            return await original_run(self, *args, **kwargs)
+        except asyncio.CancelledError:
+            cancelled_runs.append(True)
+            raise
+
+    monkeypatch.setattr(FakeDedalusRunner, "run", run)
+
+    body = json.dumps({
+        "message": "Open a bike repair shop that also rents cargo bikes",
+        "budget": "$40,000",
+        "location": "Hoboken, NJ",
+    }).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/submit",
+        "raw_path": b"/api/submit",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    sent = []
+
+    async def exercise():
+        snowflake_service._cortex_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=CortexStub(response_chars=200).build_app()),
+            timeout=10,
+        )
+        loop = asyncio.get_running_loop()
+        disconnect_at = loop.time() + DISCONNECT_AFTER_SECONDS
+        pending = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if pending:
+                return pending.pop(0)
+            # Like uvicorn: once the client is gone, answer without waiting
+            if loop.time() < disconnect_at:
+                await asyncio.sleep(disconnect_at - loop.time())
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        try:
+            await main.app(scope, receive, send)
+            # Let the cancelled agent tasks unwind
+            await asyncio.sleep(0.1)
+        finally:
+            await snowflake_service.close_cortex_client()
+
+    started = time.perf_counter()
+    asyncio.run(exercise())
+    elapsed = time.perf_counter() - started
+
+    assert started_runs, "no agent run was started before the disconnect"
+    assert elapsed < AGENT_SECONDS
+    assert len(cancelled_runs) == len(started_runs)
+    start = next(message for message in sent if message["type"] == "http.response.start")
+    assert start["status"] == 499
@@ -0,0 +1,28 @@
+"""
+Incremental Re-Run Test
+Which stages of a previous result reusable_stages keeps for changed request inputs.
+"""
+from incremental import reusable_stages
+
+PREVIOUS = {
+    "received_idea": "Open a coffee shop with a small roastery",
+    "budget": "$80,000",
+    "location": "Newark, NJ",
+    "status": "completed",
+}
+
+
+def test_unchanged_inputs_reuse_every_stage():
+    inputs = {"message": PREVIOUS["received_idea"], "budget": " $80,000 ", "location": "newark, nj"}
+    assert reusable_stages(PREVIOUS, inputs) == {"parse_intent", "orchestration", "legal", "financial", "synthesis"}
+
+
+def test_budget_change_reruns_orchestration_and_agents():
+    # Orchestration's enhanced_prompts carry the budget into both agents' prompts
+    inputs = {"message": PREVIOUS["received_idea"], "budget": "$150,000", "location": PREVIOUS["location"]}
+    assert reusable_stages(PREVIOUS, inputs) == {"parse_intent"}
+
+
+def test_failed_result_is_not_reused():
+    inputs = {"message": PREVIOUS["received_idea"], "budget": PREVIOUS["budget"], "location": PREVIOUS["location"]}
+    assert reusable_stages({**PREVIOUS, "status": "failed"}, inputs) == set()
@@ -0,0 +1,51 @@
+"""
+MCP Server Selection Test
+Tool-call latency and usage are charged to the server that exposes each tool, unrecognized
+tool calls and timed-out runs count against nobody, and a dropped server starts over on retry.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+import mcp_selection
+from mcp_selection import BRAVE_SEARCH, EXA_SEARCH, GOV_INFO, record_mcp_run, select_mcp_servers
+
+SERVERS = [GOV_INFO, BRAVE_SEARCH, EXA_SEARCH]
+INTENT = {"industry": "food service"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(mcp_selection, "_server_stats", {})
+
+
+def _record(runs: int, result):
+    for _ in range(runs):
+        record_mcp_run("legal", INTENT, SERVERS, result)
+
+
+def test_slow_tool_calls_drop_only_their_server():
+    _record(mcp_selection.MCP_MIN_SAMPLES, SimpleNamespace(tool_results=[
+        {"name": "brave_web_search", "duration_ms": 60000},
+        {"name": "gov_search_documents", "duration_ms": 400},
+        {"name": "web_search_exa", "duration_ms": 900},
+    ]))
+    assert select_mcp_servers("legal", INTENT, "high") == [GOV_INFO, EXA_SEARCH]
+
+
+def test_unattributed_runs_never_mark_servers_unused():
+    _record(mcp_selection.MCP_MIN_SAMPLES, SimpleNamespace(tools_called=["some_unknown_tool"]))
+    _record(mcp_selection.MCP_MIN_SAMPLES, SimpleNamespace(tools_called=[]))
+    _record(mcp_selection.MCP_MIN_SAMPLES, None)
+    assert select_mcp_servers("legal", INTENT, "high") == SERVERS
+
+
+def test_dropped_server_starts_over_after_retry(monkeypatch):
+    _record(mcp_selection.MCP_MIN_SAMPLES, SimpleNamespace(tools_called=["gov_search_documents"]))
+    assert select_mcp_servers("legal", INTENT, "high") == [GOV_INFO]
+
+    monkeypatch.setattr(mcp_selection, "MCP_RETRY_SECONDS", -1)
+    assert select_mcp_servers("legal", INTENT, "high") == SERVERS
+    record_mcp_run("legal", INTENT, SERVERS, SimpleNamespace(tools_called=["brave_web_search"]))
+    stats = mcp_selection._server_stats[("legal", "food service", EXA_SEARCH)]
+    assert stats["runs"] == 1
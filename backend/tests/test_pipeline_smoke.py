@@ -0,0 +1,48 @@
+"""
+Pipeline Smoke Test
+Runs process_business_idea end to end against the mock upstreams in benchmarks/mock_upstreams.py
+(in-process Cortex stub, fake Dedalus runner), so a broken stage fails here instead of on every
+/api/submit.
+
+Run from the backend directory:
+    python -m pytest -q tests
+"""
+import asyncio
+import httpx
+
+from benchmarks.mock_upstreams import CortexStub, install_fakes
+
+CORTEX_URL = "http://cortex.mock"
+
+
+def _run_pipeline(**request_fields):
+    import main
+    import snowflake_service
+
+    install_fakes(CORTEX_URL)
+    snowflake_service._cortex_client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=CortexStub(response_chars=200).build_app()),
+        timeout=10,
+    )
+
+    async def run():
+        try:
+            return await main.process_business_idea(main.BusinessIdeaRequest(**request_fields))
+        finally:
+            await snowflake_service.close_cortex_client()
+
+    return asyncio.run(run())
+
+
+def test_process_business_idea_runs_every_stage():
+    response = _run_pipeline(message="Open a coffee shop with a small roastery", budget="50k-100k", location="Newark, NJ")
+
+    assert response.success, response.message
+    data = response.data
+    assert data["status"] == "completed"
+    assert data["parsed_intent"]["industry"]
+    assert data["orchestration"]["should_call_legal"] is True
+    for section in ("legal", "financial"):
+        assert data[section]["raw"]
+        assert data[section]["formatted"]["summary"]
+    assert data["synthesized_plan"]["executive_summary"]
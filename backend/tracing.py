@@ -0,0 +1,194 @@
+"""
+Request Tracing
+One trace per API request with nested spans for Cortex calls, Dedalus runs, Snowflake SQL
+statements, PDF renders and pipeline stages. Finished traces can be written as JSON files in
+the Chrome trace event format, which chrome://tracing and https://ui.perfetto.dev open directly.
+
+TRACE_EXPORT_DIR enables the export; TRACE_SAMPLE_RATE (0-1) limits how many requests are exported.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from settings import settings
+
+TRACE_EXPORT_DIR = settings.get_str("TRACE_EXPORT_DIR")
+TRACE_SAMPLE_RATE = settings.get_float("TRACE_SAMPLE_RATE", 1.0)
+# Attribute values longer than this are truncated so traces stay small
+TRACE_MAX_ATTRIBUTE_LENGTH = 256
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_us", "end_us", "attributes", "status", "lane")
+
+    def __init__(self, name: str, parent_id: Optional[str], lane: int, attributes: Dict):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_us = time.time_ns() // 1000
+        self.end_us = None
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.lane = lane
+
+    recording = True
+
+    def set(self, **attributes):
+        for key, value in attributes.items():
+            if isinstance(value, str) and len(value) > TRACE_MAX_ATTRIBUTE_LENGTH:
+                value = value[:TRACE_MAX_ATTRIBUTE_LENGTH] + "..."
+            self.attributes[key] = value
+
+
+class _NoopSpan:
+    """Returned when no trace is active, so instrumented code never has to check"""
+    recording = False
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.spans: List[Span] = []
+        self._lanes: Dict[int, int] = {}
+
+    def lane_for_current_task(self) -> int:
+        """Concurrent tasks get separate lanes (tids) so their spans nest correctly in viewers"""
+        try:
+            task_key = id(asyncio.current_task())
+        except RuntimeError:
+            task_key = threading.get_ident()
+        return self._lanes.setdefault(task_key, len(self._lanes) + 1)
+
+    def to_chrome_trace(self) -> Dict:
+        events = [
+            {
+                "name": span.name,
+                "cat": span.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": span.start_us,
+                "dur": (span.end_us or span.start_us) - span.start_us,
+                "pid": 1,
+                "tid": span.lane,
+                "args": {
+                    **span.attributes,
+                    "status": span.status,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                },
+            }
+            for span in self.spans
+        ]
+        events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"{self.name} {self.trace_id}"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"trace_id": self.trace_id}}
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record a child span of the current span; a no-op outside a trace"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    new_span = Span(name, parent.span_id if parent else None, trace.lane_for_current_task(), attributes)
+    new_span.set(**new_span.attributes)
+    trace.spans.append(new_span)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.status = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+        new_span.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        new_span.end_us = time.time_ns() // 1000
+        _current_span.reset(token)
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Start a trace with a root span; exports it on exit when TRACE_EXPORT_DIR is set"""
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    try:
+        with span(name, **attributes) as root:
+            yield trace, root
+    finally:
+        _current_trace.reset(trace_token)
+        if TRACE_EXPORT_DIR and random.random() < TRACE_SAMPLE_RATE:
+            export_trace(trace)
+
+
+class TraceMiddleware:
+    """
+    ASGI middleware running each HTTP request in its own trace, returned in the X-Trace-Id header.
+    Ids are always generated here (trace files are named by them); a client-sent X-Trace-Id is
+    only recorded on the root span as client_trace_id. The trace ends once the whole body has been
+    sent, so work done while streaming a response is part of it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        attributes = {}
+        for name, value in scope["headers"]:
+            if name == b"x-trace-id":
+                attributes["client_trace_id"] = value.decode("latin-1")
+                break
+        with start_trace(f"{scope['method']} {scope['path']}", **attributes) as (trace, root_span):
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    root_span.set(http_status=message["status"])
+                    headers = list(message.get("headers", [])) + [(b"x-trace-id", trace.trace_id.encode("ascii"))]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
+
+
+def _write_trace(path: str, document: Dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, default=str)
+
+
+def export_trace(trace: Trace, directory: str = None) -> str:
+    """Write a trace as <directory>/<trace_id>.json, off the event loop when one is running"""
+    path = os.path.join(directory or TRACE_EXPORT_DIR, f"{trace.trace_id}.json")
+    document = trace.to_chrome_trace()
+    try:
+        asyncio.get_running_loop().run_in_executor(None, _write_trace, path, document)
+    except RuntimeError:
+        _write_trace(path, document)
+    return path
@@ -3,25 +3,41 @@ Snowflake Cortex Audio Transcription Service
 Handles audio file transcription using Snowflake Cortex AI_TRANSCRIBE SQL function
 """
 
+import asyncio
 import os
+import hashlib
 import json
+import logging
 import tempfile
-import snowflake.connector
-from dotenv import load_dotenv
+import uuid
+from settings import settings
+from bulkhead import get_bulkhead
+from metrics import time_stage
+from tracing import span
+from logging_config import payload
+from cassettes import through_cassette, cassette_key
 
-load_dotenv()
+
+logger = logging.getLogger(__name__)
 
 # Snowflake connection parameters
-SNOWFLAKE_ACCOUNT = os.getenv("SNOWFLAKE_ACCOUNT")
-SNOWFLAKE_USER = os.getenv("SNOWFLAKE_USER")
-SNOWFLAKE_PASSWORD = os.getenv("SNOWFLAKE_PASSWORD")
-SNOWFLAKE_WAREHOUSE = os.getenv("SNOWFLAKE_WAREHOUSE")
-SNOWFLAKE_DATABASE = os.getenv("SNOWFLAKE_DATABASE")
-SNOWFLAKE_SCHEMA = os.getenv("SNOWFLAKE_SCHEMA")
-SNOWFLAKE_ROLE = os.getenv("SNOWFLAKE_ROLE")
+SNOWFLAKE_ACCOUNT = settings.get_str("SNOWFLAKE_ACCOUNT")
+SNOWFLAKE_USER = settings.get_str("SNOWFLAKE_USER")
+SNOWFLAKE_PASSWORD = settings.get_str("SNOWFLAKE_PASSWORD")
+SNOWFLAKE_WAREHOUSE = settings.get_str("SNOWFLAKE_WAREHOUSE")
+SNOWFLAKE_DATABASE = settings.get_str("SNOWFLAKE_DATABASE")
+SNOWFLAKE_SCHEMA = settings.get_str("SNOWFLAKE_SCHEMA")
+SNOWFLAKE_ROLE = settings.get_str("SNOWFLAKE_ROLE")
 
 # Stage name for audio files (will be created if it doesn't exist)
-AUDIO_STAGE_NAME = os.getenv("SNOWFLAKE_AUDIO_STAGE", "audio_transcription_stage")
+AUDIO_STAGE_NAME = settings.get_str("SNOWFLAKE_AUDIO_STAGE", "audio_transcription_stage")
+
+# Authenticated sessions kept open for reuse; a connector login costs a second or more
+SNOWFLAKE_POOL_SIZE = settings.get_int("SNOWFLAKE_POOL_SIZE", 2)
+
+_idle_sessions = []
+# The stage only needs checking once per process
+_stage_ready = False
 
 
 def get_snowflake_connection():
@@ -34,6 +50,9 @@ def get_snowflake_connection():
     if not SNOWFLAKE_PASSWORD:
         raise ValueError("SNOWFLAKE_PASSWORD must be set in environment variables")
 
+    # Imported on first use: the connector takes longer to import than the rest of the app
+    import snowflake.connector
+
     conn = snowflake.connector.connect(
         account=SNOWFLAKE_ACCOUNT,
         user=SNOWFLAKE_USER,
@@ -41,21 +60,32 @@ def get_snowflake_connection():
         warehouse=SNOWFLAKE_WAREHOUSE,
         database=SNOWFLAKE_DATABASE,
         schema=SNOWFLAKE_SCHEMA,
-        role=SNOWFLAKE_ROLE
+        role=SNOWFLAKE_ROLE,
+        # Pooled sessions would otherwise expire after a few idle hours
+        client_session_keep_alive=True
     )
     return conn
 
 
+def execute_sql(cursor, sql: str):
+    """Execute a Snowflake SQL statement inside a trace span"""
+    statement = " ".join(sql.split())
+    with span("snowflake.sql", statement=statement.split(" ", 1)[0].upper(), sql=statement) as sql_span:
+        result = cursor.execute(sql)
+        sql_span.set(query_id=getattr(cursor, "sfqid", None), rowcount=getattr(cursor, "rowcount", None))
+        return result
+
+
 def ensure_stage_exists(conn):
     """
     Ensure the audio stage exists. Create it if it doesn't.
     """
     cursor = conn.cursor()
     try:
-        cursor.execute(f"USE DATABASE {SNOWFLAKE_DATABASE}")
-        cursor.execute(f"USE SCHEMA {SNOWFLAKE_SCHEMA}")
+        execute_sql(cursor, f"USE DATABASE {SNOWFLAKE_DATABASE}")
+        execute_sql(cursor, f"USE SCHEMA {SNOWFLAKE_SCHEMA}")
 
-        cursor.execute(f"SHOW STAGES LIKE '{AUDIO_STAGE_NAME}'")
+        execute_sql(cursor, f"SHOW STAGES LIKE '{AUDIO_STAGE_NAME}'")
         stages = cursor.fetchall()
 
         if not stages:
@@ -64,42 +94,112 @@ def ensure_stage_exists(conn):
               DIRECTORY = (ENABLE = TRUE)
               ENCRYPTION = (TYPE = 'SNOWFLAKE_SSE')
             """
-            cursor.execute(create_stage_sql)
-            print(f"Created stage: {AUDIO_STAGE_NAME}")
+            execute_sql(cursor, create_stage_sql)
+            logger.info("Created stage: %s", AUDIO_STAGE_NAME)
         else:
-            print(f"Stage {AUDIO_STAGE_NAME} already exists")
+            logger.debug("Stage %s already exists", AUDIO_STAGE_NAME)
     finally:
         cursor.close()
 
 
+def _open_session():
+    """Log in, set the database/schema context and make sure the stage exists (blocking)"""
+    global _stage_ready
+    conn = get_snowflake_connection()
+    try:
+        cursor = conn.cursor()
+        try:
+            execute_sql(cursor, f"USE DATABASE {SNOWFLAKE_DATABASE}")
+            execute_sql(cursor, f"USE SCHEMA {SNOWFLAKE_SCHEMA}")
+        finally:
+            cursor.close()
+        if not _stage_ready:
+            ensure_stage_exists(conn)
+            _stage_ready = True
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+async def acquire_session():
+    """An idle pooled session, or a new one opened off the event loop"""
+    while _idle_sessions:
+        conn = _idle_sessions.pop()
+        is_closed = getattr(conn, "is_closed", None)
+        if is_closed is None or not is_closed():
+            return conn
+    with time_stage("transcribe_connect"):
+        return await asyncio.to_thread(_open_session)
+
+
+def release_session(conn, reusable: bool):
+    """Return a session to the pool, or close it if it failed or the pool is full"""
+    if reusable and len(_idle_sessions) < SNOWFLAKE_POOL_SIZE:
+        _idle_sessions.append(conn)
+    else:
+        conn.close()
+
+
+async def warm_sessions(count: int = 1) -> int:
+    """Open sessions ahead of the first transcription; returns how many are idle afterwards"""
+    missing = min(count, SNOWFLAKE_POOL_SIZE) - len(_idle_sessions)
+    if missing > 0:
+        sessions = await asyncio.gather(*(asyncio.to_thread(_open_session) for _ in range(missing)))
+        for conn in sessions:
+            release_session(conn, reusable=True)
+    return len(_idle_sessions)
+
+
+async def close_sessions():
+    """Close every idle pooled session (at shutdown)"""
+    sessions = list(_idle_sessions)
+    _idle_sessions.clear()
+    for conn in sessions:
+        await asyncio.to_thread(conn.close)
+
+
 async def transcribe_audio_from_bytes(audio_bytes: bytes, filename: str = "recording.webm") -> str:
     """
     Transcribe audio from bytes using Snowflake Cortex AI_TRANSCRIBE SQL function.
+    The Snowflake SQL session is opened inside the snowflake_sql bulkhead.
     """
+    async with get_bulkhead("snowflake_sql").acquire():
+        # Keyed by the audio content; the file name does not change the transcript
+        return await through_cassette(
+            "transcribe",
+            cassette_key("transcribe", hashlib.sha256(audio_bytes).hexdigest()),
+            lambda: _transcribe_with_session(audio_bytes, filename),
+            lambda transcript: transcript,
+            lambda transcript: transcript,
+            request_summary={"filename": filename, "bytes": len(audio_bytes)},
+        )
+
+
+async def _transcribe_with_session(audio_bytes: bytes, filename: str) -> str:
     if not SNOWFLAKE_ACCOUNT or not SNOWFLAKE_USER:
         raise ValueError("SNOWFLAKE_ACCOUNT and SNOWFLAKE_USER must be set in environment variables")
 
     conn = None
+    reusable = False
     temp_file_path = None
+    staged = False
+    # Unique per request: PUT stages the file under its local name, and concurrent uploads
+    # must not overwrite each other's audio
+    staged_name = f"{uuid.uuid4().hex}.webm"
 
     try:
-        # Save audio to a temp file with a fixed name (recording.webm)
         temp_dir = tempfile.gettempdir()
-        temp_file_path = os.path.join(temp_dir, "recording.webm")
+        temp_file_path = os.path.join(temp_dir, staged_name)
         with open(temp_file_path, "wb") as temp_file:
             temp_file.write(audio_bytes)
-        print(f"Temporary audio file created: {temp_file_path}")
+        logger.debug("Temporary audio file created: %s", temp_file_path)
 
-        # Connect to Snowflake
-        conn = get_snowflake_connection()
-        ensure_stage_exists(conn)
+        # Pooled session, already in the right database/schema with the stage in place
+        conn = await acquire_session()
 
         cursor = conn.cursor()
         try:
-            # Set DB and Schema context
-            cursor.execute(f"USE DATABASE {SNOWFLAKE_DATABASE}")
-            cursor.execute(f"USE SCHEMA {SNOWFLAKE_SCHEMA}")
-
             # Upload file to stage
             normalized_path = temp_file_path.replace("\\", "/")
 # ensure Windows drive letter has an extra slash after 'C:'
@@ -113,20 +213,24 @@ async def transcribe_audio_from_bytes(audio_bytes: bytes, filename: str = "recor
             )
 
 
-            cursor.execute(put_sql)
-            print(f"Uploaded recording.webm to stage {AUDIO_STAGE_NAME}")
+            # The connector blocks for the whole upload and transcription, so run it off the loop
+            with time_stage("transcribe_upload"):
+                await asyncio.to_thread(execute_sql, cursor, put_sql)
+            staged = True
+            logger.debug("Uploaded %s to stage %s", staged_name, AUDIO_STAGE_NAME)
 
-            # Confirm file exists
-            cursor.execute(f"LIST @{AUDIO_STAGE_NAME}")
-            files = cursor.fetchall()
-            print("Files currently in stage:", files)
+            # Listing the stage is an extra round trip, so only do it when it will be logged
+            if logger.isEnabledFor(logging.DEBUG):
+                await asyncio.to_thread(execute_sql, cursor, f"LIST @{AUDIO_STAGE_NAME}")
+                logger.debug("Files currently in stage: %s", payload(cursor.fetchall()))
 
             # Run AI_TRANSCRIBE
-            transcribe_sql = f"SELECT AI_TRANSCRIBE(TO_FILE('@{AUDIO_STAGE_NAME}/recording.webm')) AS transcript;"
+            transcribe_sql = f"SELECT AI_TRANSCRIBE(TO_FILE('@{AUDIO_STAGE_NAME}/{staged_name}')) AS transcript;"
 
-            cursor.execute(transcribe_sql)
+            with time_stage("transcribe_ai_transcribe"):
+                await asyncio.to_thread(execute_sql, cursor, transcribe_sql)
             result = cursor.fetchone()
-            print("Raw transcription result:", result)
+            logger.debug("Raw transcription result: %s", payload(result))
 
             if not result or not result[0]:
                 raise Exception("AI_TRANSCRIBE returned empty result")
@@ -140,6 +244,7 @@ async def transcribe_audio_from_bytes(audio_bytes: bytes, filename: str = "recor
             if isinstance(transcript_data, dict):
                 transcript = transcript_data.get("text", "")
                 if transcript:
+                    reusable = True
                     return transcript.strip()
                 else:
                     raise Exception(f"Unexpected AI_TRANSCRIBE response format: {transcript_data}")
@@ -147,18 +252,23 @@ async def transcribe_audio_from_bytes(audio_bytes: bytes, filename: str = "recor
                 raise Exception(f"Unexpected AI_TRANSCRIBE response type: {type(transcript_data)}")
 
         finally:
+            if staged:
+                try:
+                    await asyncio.to_thread(execute_sql, cursor, f"REMOVE @{AUDIO_STAGE_NAME}/{staged_name}")
+                except Exception as cleanup_error:
+                    logger.warning("Could not remove staged file %s: %s", staged_name, cleanup_error)
             cursor.close()
     except Exception as e:
-        print(f"Error during Snowflake transcription: {e}")
+        logger.error("Error during Snowflake transcription: %s", e)
         raise Exception(f"Snowflake transcription error: {str(e)}") from e
     finally:
         if conn:
-            conn.close()
+            release_session(conn, reusable)
         if temp_file_path and os.path.exists(temp_file_path):
             try:
                 os.unlink(temp_file_path)
             except Exception as cleanup_error:
-                print(f"Warning: Could not delete temporary file {temp_file_path}: {cleanup_error}")
+                logger.warning("Could not delete temporary file %s: %s", temp_file_path, cleanup_error)
 
 
 async def transcribe_audio(audio_file_path: str) -> str:
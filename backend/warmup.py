@@ -0,0 +1,91 @@
+"""
+Worker Warm-Up
+Runs after startup, before the worker reports ready: opens the pooled Cortex connection (TLS to
+SNOWFLAKE_HOST), builds the shared Dedalus client, logs in Snowflake SQL sessions for
+transcription, and optionally pings Cortex. GET /ready returns 503 until this has finished, so
+the load balancer only routes traffic to warm workers.
+
+WARMUP_STEPS selects steps (default "cortex,dedalus,snowflake"; empty disables warm-up).
+A failed step is logged and reported but does not keep the worker unready; the first request
+that needs it simply pays the setup cost, as it did before.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict
+from settings import settings
+from snowflake_service import warm_cortex
+from dedalus_agent import warm_dedalus
+from transcription_service import warm_sessions
+from cassettes import UPSTREAM_MODE
+
+logger = logging.getLogger(__name__)
+
+# Replayed runs never touch the upstreams, so there is nothing to warm
+_DEFAULT_STEPS = "" if UPSTREAM_MODE == "replay" else "cortex,dedalus,snowflake"
+WARMUP_STEPS = [step.strip() for step in settings.get_str("WARMUP_STEPS", _DEFAULT_STEPS).split(",") if step.strip()]
+# Also run a one-token Cortex completion (costs a few tokens per worker start)
+WARMUP_CORTEX_PING = settings.get_bool("WARMUP_CORTEX_PING", False)
+# Snowflake SQL sessions to open ahead of time (capped by SNOWFLAKE_POOL_SIZE)
+WARMUP_SNOWFLAKE_SESSIONS = settings.get_int("WARMUP_SNOWFLAKE_SESSIONS", 1)
+# Per-step limit, so a hung upstream cannot keep the worker out of rotation
+WARMUP_STEP_TIMEOUT_SECONDS = settings.get_float("WARMUP_STEP_TIMEOUT_SECONDS", 30)
+
+
+async def _warm_cortex():
+    return await warm_cortex(ping=WARMUP_CORTEX_PING)
+
+
+async def _warm_snowflake():
+    return {"idle_sessions": await warm_sessions(WARMUP_SNOWFLAKE_SESSIONS)}
+
+
+WARMUP_FUNCTIONS = {
+    "cortex": _warm_cortex,
+    "dedalus": warm_dedalus,
+    "snowflake": _warm_snowflake,
+}
+
+
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.started_at = None
+        self.finished_at = None
+        self.steps: Dict[str, Dict] = {}
+
+    async def _run_step(self, name: str):
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(WARMUP_FUNCTIONS[name](), timeout=WARMUP_STEP_TIMEOUT_SECONDS)
+            self.steps[name] = {"status": "ok", "result": result}
+        except asyncio.TimeoutError:
+            self.steps[name] = {"status": "timeout"}
+            logger.warning("Warm-up step %s timed out after %ss", name, WARMUP_STEP_TIMEOUT_SECONDS)
+        except Exception as e:
+            self.steps[name] = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+            logger.warning("Warm-up step %s failed: %s", name, e)
+        self.steps[name]["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def warm_up(self, steps=None):
+        """Run the warm-up steps concurrently, then mark the worker ready"""
+        steps = WARMUP_STEPS if steps is None else steps
+        self.started_at = time.time()
+        unknown = [name for name in steps if name not in WARMUP_FUNCTIONS]
+        for name in unknown:
+            self.steps[name] = {"status": "unknown_step", "duration_ms": 0.0}
+        await asyncio.gather(*(self._run_step(name) for name in steps if name in WARMUP_FUNCTIONS))
+        self.finished_at = time.time()
+        self.ready = True
+        logger.info("Worker ready after %.0f ms warm-up: %s", (self.finished_at - self.started_at) * 1000,
+                    {name: step["status"] for name, step in self.steps.items()})
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "warmup_ms": round((self.finished_at - self.started_at) * 1000, 1) if self.finished_at else None,
+            "steps": self.steps,
+        }
+
+
+readiness = Readiness()
@@ -0,0 +1,247 @@
+"""
+Write-Behind Persistence
+Buffers idea, result and brief records off the request path and flushes them to MongoDB
+in batches (insert_many / bulk_write), on a size or time trigger and on shutdown.
+
+Records that fail on a transient error (MongoDB unreachable, network timeout) stay buffered
+until it recovers, bounded by WRITE_BEHIND_MAX_BACKLOG. Records that fail on their own (a write
+error, a document that cannot be encoded or is too large) are retried at most
+WRITE_BEHIND_MAX_ATTEMPTS times and then logged and dropped, so they cannot block the others.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Dict
+from bson import ObjectId
+from settings import settings
+from pymongo import UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError, NetworkTimeout, ServerSelectionTimeoutError
+from database import get_db
+
+
+logger = logging.getLogger(__name__)
+
+# Flush as soon as this many records are buffered
+WRITE_BEHIND_BATCH_SIZE = settings.get_int("WRITE_BEHIND_BATCH_SIZE", 100)
+# ...or after this many seconds, whichever comes first
+WRITE_BEHIND_FLUSH_SECONDS = settings.get_float("WRITE_BEHIND_FLUSH_SECONDS", 2)
+# Oldest records are dropped beyond this backlog (e.g. while MongoDB is unreachable)
+WRITE_BEHIND_MAX_BACKLOG = settings.get_int("WRITE_BEHIND_MAX_BACKLOG", 10000)
+# Writes of one record that may fail on the record itself before it is dropped
+WRITE_BEHIND_MAX_ATTEMPTS = settings.get_int("WRITE_BEHIND_MAX_ATTEMPTS", 3)
+
+DUPLICATE_KEY_ERROR = 11000
+# Failures of the connection rather than the records; the records are kept for a later flush
+TRANSIENT_ERRORS = (AutoReconnect, NetworkTimeout, ServerSelectionTimeoutError)
+
+
+class WriteBehindBuffer:
+    def __init__(self, get_db: Callable, batch_size: int, flush_seconds: float, max_backlog: int,
+                 max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS):
+        self._get_db = get_db
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_backlog = max_backlog
+        self.max_attempts = max_attempts
+        # ("insert", collection, document, failed attempts) or ("push_idea", user_id, idea_id, failed attempts)
+        self._pending = deque()
+        self._wakeup = None
+        self._task = None
+        self._flush_lock = asyncio.Lock()
+        self.flushes = 0
+        self.written = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.dead_lettered = 0
+        self.total_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+
+    def _append(self, operation: tuple):
+        if self._get_db() is None:
+            # No database configured: nothing will ever flush these
+            self.dropped += 1
+            return
+        self._pending.append(operation)
+        while len(self._pending) > self.max_backlog:
+            self._pending.popleft()
+            self.dropped += 1
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def insert(self, collection: str, document: dict):
+        """Queue a document for a batched insert"""
+        self._append(("insert", collection, document, 0))
+
+    def push_user_idea(self, user_id: str, idea_id: ObjectId):
+        """Queue appending an idea id to a user's ideas list"""
+        if user_id and ObjectId.is_valid(user_id):
+            self._append(("push_idea", user_id, idea_id, 0))
+
+    async def start(self):
+        """Start the background flush loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and flush whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """
+        Write every buffered record, grouped into one bulk call per collection.
+        Unwritten records are put back at the front of the buffer for the next flush (see the
+        module docstring for which); duplicate-key errors mean the record is already stored.
+        """
+        async with self._flush_lock:
+            db = self._get_db()
+            if db is None or not self._pending:
+                return
+
+            batch = list(self._pending)
+            self._pending.clear()
+            # collection -> (buffered operations, the matching documents or update requests)
+            steps: Dict[str, tuple] = {}
+            for operation in batch:
+                if operation[0] == "insert":
+                    collection, request = operation[1], operation[2]
+                else:
+                    # $addToSet, so a retried flush whose first attempt did land adds nothing twice
+                    collection, request = "users", UpdateOne(
+                        {"_id": ObjectId(operation[1])},
+                        {"$addToSet": {"ideas": operation[2]}}
+                    )
+                operations, requests = steps.setdefault(collection, ([], []))
+                operations.append(operation)
+                requests.append(request)
+
+            retry = []
+            started = time.perf_counter()
+            pending_steps = list(steps.items())
+            try:
+                for position, (collection, (operations, requests)) in enumerate(pending_steps):
+                    # Leading operations of this step already written, re-queued or dropped
+                    handled = 0
+                    try:
+                        try:
+                            await self._write(db, collection, requests)
+                            self.written += len(operations)
+                            handled = len(operations)
+                        except BulkWriteError as e:
+                            retry.extend(self._failed_writes(collection, operations, e))
+                            handled = len(operations)
+                        except TRANSIENT_ERRORS:
+                            raise
+                        except Exception as e:
+                            # Raised for the whole call (e.g. one document too large to encode):
+                            # write the records one by one so only the bad ones are dropped
+                            logger.warning("Write-behind batch to %s failed (%s); writing its records one by one",
+                                           collection, e)
+                            for operation, request in zip(operations, requests):
+                                try:
+                                    await self._write(db, collection, [request])
+                                    self.written += 1
+                                except BulkWriteError as one:
+                                    retry.extend(self._failed_writes(collection, [operation], one))
+                                except TRANSIENT_ERRORS:
+                                    raise
+                                except Exception as one:
+                                    self._dead_letter(collection, operation, one)
+                                handled += 1
+                    except BaseException as e:
+                        # Connection-level failure (or shutdown): nothing later in this flush gets through
+                        retry.extend(operations[handled:])
+                        for _, (remaining, _) in pending_steps[position + 1:]:
+                            retry.extend(remaining)
+                        if not isinstance(e, Exception):
+                            raise
+                        logger.warning("Write-behind flush to %s failed: %s", collection, e)
+                        break
+            finally:
+                elapsed = time.perf_counter() - started
+                self.flushes += 1
+                self.last_flush_seconds = elapsed
+                self.total_flush_seconds += elapsed
+                self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+                if retry:
+                    self._requeue(retry, len(batch))
+
+    @staticmethod
+    async def _write(db, collection: str, requests: list):
+        if collection == "users":
+            await db.users.bulk_write(requests, ordered=False)
+        else:
+            await db[collection].insert_many(requests, ordered=False)
+
+    def _failed_writes(self, collection: str, operations: list, error: BulkWriteError) -> list:
+        """Records to retry after a BulkWriteError, one failed attempt later; dead-letters the exhausted ones"""
+        errors = {
+            entry["index"]: entry for entry in error.details.get("writeErrors", [])
+            if entry.get("code") != DUPLICATE_KEY_ERROR
+        }
+        self.written += len(operations) - len(errors)
+        retry = []
+        for index, entry in errors.items():
+            operation = operations[index]
+            attempts = operation[3] + 1
+            if attempts >= self.max_attempts:
+                self._dead_letter(collection, operation, entry.get("errmsg", entry.get("code")))
+            else:
+                retry.append(operation[:3] + (attempts,))
+        return retry
+
+    def _dead_letter(self, collection: str, operation: tuple, error):
+        self.dead_lettered += 1
+        record_id = operation[1] if operation[0] == "push_idea" else operation[2].get("_id")
+        logger.error("Write-behind dropped a %s record for %s (%s) after %d failed attempts: %s",
+                     collection, record_id, operation[0], operation[3] + 1, error)
+
+    def _requeue(self, operations: list, batch_size: int):
+        """Put unwritten records back at the front of the buffer, still bounded by max_backlog"""
+        self.failed_flushes += 1
+        logger.warning("Write-behind flush left %d of %d records unwritten; retrying on the next flush",
+                       len(operations), batch_size)
+        self._pending.extendleft(reversed(operations))
+        # The oldest records go first
+        while len(self._pending) > self.max_backlog:
+            self._pending.popleft()
+            self.dropped += 1
+
+    def stats(self) -> Dict:
+        return {
+            "backlog": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "dead_lettered": self.dead_lettered,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+            "avg_flush_ms": round(self.total_flush_seconds / self.flushes * 1000, 2) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 2),
+        }
+
+
+write_behind = WriteBehindBuffer(
+    get_db,
+    batch_size=WRITE_BEHIND_BATCH_SIZE,
+    flush_seconds=WRITE_BEHIND_FLUSH_SECONDS,
+    max_backlog=WRITE_BEHIND_MAX_BACKLOG,
+)
@@ -59,7 +59,7 @@ function App() {
 
     try {
       const token = localStorage.getItem('token')
-      const res = await fetch('http://localhost:3000/api/submit', {
+      const res = await fetch('http://localhost:3000/api/submit?fields=received_idea,budget,location,legal.formatted,financial.formatted,synthesized_plan', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',